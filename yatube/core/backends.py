@@ -0,0 +1,88 @@
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (
+    DjangoTemplates,
+    Template,
+    reraise,
+)
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core import metrics, timing
+
+MISSING = object()
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timing.measure('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время отрисовки шаблонов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class TimedCacheMixin:
+    """Замеряет время обращений к кешу и считает попадания."""
+
+    def get(self, key, default=None, version=None):
+        with timing.measure('cache'):
+            value = super().get(key, MISSING, version)
+        if value is MISSING:
+            metrics.inc('yatube_cache_requests_total', result='miss')
+            return default
+        metrics.inc('yatube_cache_requests_total', result='hit')
+        return value
+
+    def get_many(self, *args, **kwargs):
+        with timing.measure('cache'):
+            return super().get_many(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        with timing.measure('cache'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timing.measure('cache'):
+            return super().set_many(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with timing.measure('cache'):
+            return super().add(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timing.measure('cache'):
+            return super().delete(*args, **kwargs)
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    pass
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    def get_thumbnail(self, *args, **kwargs):
+        with timing.measure('thumbnail'):
+            return super().get_thumbnail(*args, **kwargs)
+
+    def _create_thumbnail(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._create_thumbnail(*args, **kwargs)
+        finally:
+            metrics.observe(
+                'yatube_thumbnail_generation_seconds',
+                time.perf_counter() - start
+            )
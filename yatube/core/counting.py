@@ -0,0 +1,104 @@
+"""
+Подсчёт строк для пагинации без COUNT(*) по всей таблице на каждый запрос.
+
+Выборки меньше COUNT_EXACT_THRESHOLD строк считаются точно, и этот
+подсчёт читает не больше порога. Для больших берётся число из кеша:
+при промахе оно считается один раз и живёт COUNT_CACHE_SECONDS, а
+именованные счётчики (count_key) между пересчётами поправляют сигналы
+создания и удаления. Массовые операции мимо сигналов дают расхождение,
+которое исчезнет с истечением кеша или после invalidate().
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def count_key(model, **filters):
+    """Ключ счётчика модели, отфильтрованной по равенству полей."""
+    parts = [model._meta.label_lower]
+    parts += [f'{name}={value}' for name, value in sorted(filters.items())]
+    return 'count:' + ':'.join(parts)
+
+
+def version_key(model):
+    return f'count:{model._meta.label_lower}:version'
+
+
+def query_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    version = cache.get(version_key(queryset.model), 0)
+    return f'count:{queryset.model._meta.label_lower}:{version}:{digest}'
+
+
+def count(queryset, key=None):
+    if key is None:
+        try:
+            key = query_key(queryset)
+        except EmptyResultSet:
+            # .none() или пустой __in: строк заведомо нет.
+            return 0
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    threshold = settings.COUNT_EXACT_THRESHOLD
+    bounded = queryset.order_by()[:threshold].count()
+    if bounded < threshold:
+        return bounded
+    total = queryset.count()
+    cache.set(key, total, settings.COUNT_CACHE_SECONDS)
+    return total
+
+
+def adjust(instance, delta, fields=()):
+    """Поправляет счётчики всей таблицы и значений полей fields объекта."""
+    model = type(instance)
+    keys = [count_key(model)]
+    for name in fields:
+        value = getattr(instance, name)
+        if value is not None:
+            keys.append(count_key(model, **{name: value}))
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Счётчика ещё нет: его посчитают при первом обращении.
+            pass
+
+
+def invalidate(model, **values):
+    """
+    Сбрасывает счётчики модели после массовой операции: общий,
+    именованные по значениям полей (invalidate(Post, group_id=[1, 2]))
+    и все счётчики произвольных выборок (их ключи меняются вместе
+    с версией модели).
+    """
+    keys = [count_key(model)]
+    keys += [
+        count_key(model, **{field: value})
+        for field, field_values in values.items()
+        for value in field_values
+    ]
+    cache.delete_many(keys)
+    cache.add(version_key(model), 0, None)
+    cache.incr(version_key(model))
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт число строк через count()."""
+
+    def __init__(self, object_list, per_page, *args, count_key=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, *args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            return count(self.object_list, self.count_key)
+        return super().count
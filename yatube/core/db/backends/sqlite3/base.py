@@ -0,0 +1,158 @@
+"""
+SQLite с настройкой под конкурентную нагрузку.
+
+На каждом соединении выполняются прагмы из профиля OPTIONS['profile']
+(и точечные переопределения из OPTIONS['pragmas']). Запись, упёршаяся
+в блокировку, повторяется с экспоненциальной задержкой и джиттером,
+а транзакции можно открывать сразу на запись: OPTIONS['transaction_mode'].
+"""
+import random
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+from core import metrics
+
+Database = base.Database
+
+PRAGMA_PROFILES = {
+    'default': {},
+    # WAL: читатели не ждут писателя, писатель не ждёт читателей.
+    # synchronous=NORMAL в WAL не теряет целостность, только последние
+    # транзакции при отключении питания.
+    'production': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+    # Для разовой загрузки данных: быстрее, но без гарантий при сбое.
+    'bulk': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -256 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+BACKEND_OPTIONS = {
+    'profile': 'default',
+    'pragmas': {},
+    'transaction_mode': None,
+    'busy_retries': 5,
+    'busy_backoff': 0.05,
+}
+
+
+def is_busy(exc):
+    message = str(exc)
+    return 'database is locked' in message or 'table is locked' in message
+
+
+def retry_busy(func, retries, backoff, *args):
+    """
+    Вызывает func, повторяя его при блокировке базы. Задержка перед
+    n-й попыткой случайна в пределах backoff * 2 ** n, чтобы
+    конкурирующие писатели не просыпались одновременно.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except Database.OperationalError as exc:
+            if attempt == retries or not is_busy(exc):
+                raise
+        metrics.inc('yatube_db_busy_retries_total')
+        time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+def apply_pragmas(conn, pragmas):
+    pragmas = dict(pragmas)
+    # busy_timeout первым: смене journal_mode тоже может
+    # понадобиться подождать блокировку.
+    timeout = pragmas.pop('busy_timeout', None)
+    if timeout is not None:
+        conn.execute(f'PRAGMA busy_timeout = {int(timeout)}')
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.backend_options = {
+            name: options.get(name, default)
+            for name, default in BACKEND_OPTIONS.items()
+        }
+        profile = self.backend_options['profile']
+        if profile not in PRAGMA_PROFILES:
+            raise ImproperlyConfigured(
+                f'Неизвестный профиль прагм SQLite: {profile}'
+            )
+        mode = self.backend_options['transaction_mode']
+        if mode is not None and mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}'
+            )
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for name in BACKEND_OPTIONS:
+            kwargs.pop(name, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, dict(
+            PRAGMA_PROFILES[self.backend_options['profile']],
+            **self.backend_options['pragmas']
+        ))
+        return conn
+
+    def use_profile(self, profile):
+        """
+        Переключает открытое соединение на другой профиль, например
+        bulk в командах загрузки. Вызывается вне транзакции.
+        journal_mode хранится в файле базы, поэтому остаётся прежним.
+        """
+        pragmas = dict(PRAGMA_PROFILES[profile])
+        pragmas.pop('journal_mode', None)
+        apply_pragmas(self.connection, pragmas)
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.retries = self.backend_options['busy_retries']
+        cursor.backoff = self.backend_options['busy_backoff']
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.backend_options['transaction_mode']
+        if mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {mode}')
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Повторяет запросы, получившие "database is locked". Внутри
+    транзакции повтор не поможет: снимок уже устарел, и ждать
+    бесполезно, поэтому там ошибка уходит наверх сразу.
+    """
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, param_list)
+
+    def _retry(self, func, *args):
+        if self.connection.in_transaction:
+            return func(*args)
+        return retry_busy(func, self.retries, self.backoff, *args)
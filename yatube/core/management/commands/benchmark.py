@@ -0,0 +1,317 @@
+import io
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, login
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.utils import timezone
+
+from core.queries import record_queries
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+VIEWS = (
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'follow_index',
+    'create_post',
+    'add_comment',
+)
+
+LOGIN_REQUIRED = ('follow_index', 'create_post', 'add_comment')
+
+# Смешанная нагрузка: чтения и записи вперемешку в одном прогоне.
+MIXED_READS = ('index', 'group_posts', 'profile', 'post_detail')
+MIXED_WRITES = ('create_post', 'add_comment')
+
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(int(round(fraction * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class WSGIClient:
+    """
+    Минимальный WSGI-клиент: вызывает приложение в том же процессе,
+    без сети и без тестового окружения Django.
+    """
+
+    def __init__(self, application, session_key=None):
+        self.application = application
+        self.cookies = {}
+        if session_key:
+            self.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            request = HttpRequest()
+            self.csrf_token = get_token(request)
+            self.cookies[settings.CSRF_COOKIE_NAME] = (
+                request.META['CSRF_COOKIE']
+            )
+
+    def request(self, method, path, data=None):
+        body = b''
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.csrf_token)
+            body = urlencode(data).encode()
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            ),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+
+        def start_response(status_line, headers, exc_info=None):
+            status.append(int(status_line.split()[0]))
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон публичных представлений через WSGI-приложение '
+        'в том же процессе. Пишет задержки p50/p95/p99, пропускную '
+        'способность и число запросов к БД в JSON для сравнения прогонов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views', default=','.join(VIEWS),
+            help='Представления через запятую; mixed — чтения и записи '
+                 'вперемешку.'
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля записей в прогоне mixed.'
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--users', type=int, default=20,
+                            help='Сколько пользователей залогинить.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+        parser.add_argument('--compare',
+                            help='Файл прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        views = options['views'].split(',')
+        unknown = set(views) - set(VIEWS) - {'mixed'}
+        if unknown:
+            raise CommandError(f'Неизвестные представления: {unknown}')
+        self.rng = random.Random(options['seed'])
+        self.rng_lock = threading.Lock()
+        self.write_ratio = options['write_ratio']
+        self.application = WSGIHandler()
+        self.load_targets(options['users'])
+        results = {}
+        for view in views:
+            runs = self.run(view, options['requests'], options['concurrency'])
+            for name, result in runs.items():
+                results[name] = result
+                self.report(name, result)
+        run = {
+            'commit': self.commit(),
+            'created': timezone.now().isoformat(),
+            'options': {
+                key: options[key]
+                for key in (
+                    'requests', 'concurrency', 'users', 'seed', 'write_ratio'
+                )
+            },
+            'dataset': {
+                model._meta.model_name: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            'views': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(run, file, indent=2)
+        if options['compare']:
+            with open(options['compare']) as file:
+                self.compare(json.load(file), run)
+
+    def load_targets(self, users):
+        """Выбирает случайные группы, авторов, посты и сессии."""
+        def sample(queryset):
+            values = list(queryset[:SAMPLE_SIZE])
+            if not values:
+                raise CommandError('Сначала сгенерируйте данные.')
+            return values
+
+        self.slugs = sample(Group.objects.values_list('slug', flat=True))
+        self.usernames = sample(
+            User.objects.filter(posts__isnull=False).distinct()
+            .values_list('username', flat=True)
+        )
+        self.post_ids = sample(
+            Post.objects.order_by('-pub_date').values_list('id', flat=True)
+        )
+        engine = import_module(settings.SESSION_ENGINE)
+        self.session_keys = []
+        for user in User.objects.filter(follower__isnull=False).distinct()[
+                :users]:
+            request = HttpRequest()
+            request.session = engine.SessionStore()
+            login(request, user, settings.AUTHENTICATION_BACKENDS[0])
+            request.session.save()
+            self.session_keys.append(request.session.session_key)
+        if not self.session_keys:
+            raise CommandError('Нет пользователей с подписками.')
+
+    def choice(self, values):
+        with self.rng_lock:
+            return self.rng.choice(values)
+
+    def target(self, view):
+        """Метод, адрес и данные формы для одного запроса."""
+        if view == 'index':
+            return 'GET', reverse('posts:index'), None
+        if view == 'group_posts':
+            slug = self.choice(self.slugs)
+            return 'GET', reverse('posts:group_posts', args=[slug]), None
+        if view == 'profile':
+            username = self.choice(self.usernames)
+            return 'GET', reverse('posts:profile', args=[username]), None
+        if view == 'post_detail':
+            post_id = self.choice(self.post_ids)
+            return 'GET', reverse('posts:post_detail', args=[post_id]), None
+        if view == 'follow_index':
+            return 'GET', reverse('posts:follow_index'), None
+        if view == 'create_post':
+            return 'POST', reverse('posts:create_post'), {
+                'text': 'Пост из нагрузочного прогона',
+            }
+        post_id = self.choice(self.post_ids)
+        return 'POST', reverse('posts:add_comment', args=[post_id]), {
+            'text': 'Комментарий из нагрузочного прогона',
+        }
+
+    def one(self, view):
+        if view == 'mixed':
+            with self.rng_lock:
+                if self.rng.random() < self.write_ratio:
+                    view = self.rng.choice(MIXED_WRITES)
+                else:
+                    view = self.rng.choice(MIXED_READS)
+        session_key = None
+        if view in LOGIN_REQUIRED:
+            session_key = self.choice(self.session_keys)
+        client = WSGIClient(self.application, session_key)
+        method, path, data = self.target(view)
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            status = client.request(method, path, data)
+        return view, time.perf_counter() - start, recorder.count, status
+
+    def run(self, view, requests, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = list(executor.map(self.one, [view] * requests))
+        elapsed = time.perf_counter() - started
+        if view != 'mixed':
+            return {view: self.summary(samples, elapsed)}
+        return {
+            f'mixed:{kind}': self.summary(
+                [sample for sample in samples if sample[0] in views],
+                elapsed,
+            )
+            for kind, views in (
+                ('read', MIXED_READS), ('write', MIXED_WRITES)
+            )
+        }
+
+    @staticmethod
+    def summary(samples, elapsed):
+        requests = len(samples)
+        if not requests:
+            return None
+        latencies = sorted(latency for _, latency, _, _ in samples)
+        return {
+            'requests': requests,
+            'errors': sum(status >= 400 for _, _, _, status in samples),
+            'throughput_rps': round(requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries_per_request': round(
+                sum(count for _, _, count, _ in samples) / requests, 2
+            ),
+        }
+
+    def report(self, view, result):
+        if result is None:
+            return
+        self.stdout.write(
+            f'{view:14} {result["throughput_rps"]:8.1f} rps  '
+            f'p50 {result["p50_ms"]:7.1f}  p95 {result["p95_ms"]:7.1f}  '
+            f'p99 {result["p99_ms"]:7.1f} мс  '
+            f'{result["queries_per_request"]:5.1f} SQL/запрос  '
+            f'ошибок {result["errors"]}'
+        )
+
+    def compare(self, old, new):
+        self.stdout.write(
+            f'Сравнение с {old.get("commit") or "прошлым прогоном"}:'
+        )
+        for view, result in new['views'].items():
+            before = old['views'].get(view)
+            if before is None or result is None:
+                continue
+            changes = []
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if before[key]:
+                    delta = (result[key] - before[key]) / before[key] * 100
+                    changes.append(f'{key} {delta:+.0f}%')
+            self.stdout.write(f'{view:14} ' + ', '.join(changes))
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+                cwd=settings.BASE_DIR,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
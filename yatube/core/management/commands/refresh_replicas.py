@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет реплики SQLite из DATABASE_REPLICAS копией основной '
+        'базы через backup API. Копия пишется во временный файл и '
+        'подменяет реплику целиком, так что читатели не видят её '
+        'наполовину записанной. С --interval повторяет обновление.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Обновлять каждые N секунд, пока не прервут.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        for alias in ('default', *settings.DATABASE_REPLICAS):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias}: поддерживается только SQLite.')
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                self.refresh(alias)
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self, alias):
+        started = time.monotonic()
+        source = connections['default']
+        source.ensure_connection()
+        path = connections[alias].settings_dict['NAME']
+        temporary = f'{path}.tmp'
+        target = sqlite3.connect(temporary)
+        try:
+            source.connection.backup(target)
+            # Реплику только читают: журнал WAL ей не нужен, а его
+            # файлы пережили бы подмену основного файла.
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.replace(temporary, path)
+        connections[alias].close()
+        self.stdout.write(
+            f'{alias}: обновлена за {time.monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,62 @@
+import json
+import sys
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from core.queries import normalize
+
+
+class Command(BaseCommand):
+    help = 'Сводка лога медленных запросов по нормализованной форме SQL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'logs', nargs='*',
+            help='Файлы лога, без аргументов читается stdin.'
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def read_events(self, logs):
+        files = [open(path) for path in logs] or [sys.stdin]
+        for file in files:
+            with file:
+                for line in file:
+                    start = line.find('{')
+                    if start == -1:
+                        continue
+                    try:
+                        event = json.loads(line[start:])
+                    except ValueError:
+                        continue
+                    if event.get('event') == 'slow_query':
+                        yield event
+
+    def handle(self, *args, **options):
+        stats = {}
+        for event in self.read_events(options['logs']):
+            shape = normalize(event['sql'])
+            entry = stats.setdefault(shape, {
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'sources': Counter(),
+            })
+            # Подавленные повторы считаем с длительностью записанного.
+            count = 1 + event.get('suppressed', 0)
+            entry['count'] += count
+            entry['total_ms'] += event['duration_ms'] * count
+            entry['max_ms'] = max(entry['max_ms'], event['duration_ms'])
+            source = event.get('template') or event.get('caller')
+            entry['sources'][source] += count
+        ranked = sorted(
+            stats.items(), key=lambda item: item[1]['total_ms'], reverse=True
+        )
+        for shape, entry in ranked[:options['limit']]:
+            self.stdout.write(
+                f'{entry["total_ms"]:10.1f} мс всего, '
+                f'{entry["count"]} раз, максимум {entry["max_ms"]:.1f} мс'
+            )
+            self.stdout.write(f'    {shape}')
+            for source, count in entry['sources'].most_common(3):
+                self.stdout.write(f'    <- {source} ({count})')
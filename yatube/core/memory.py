@@ -0,0 +1,138 @@
+"""
+Учёт памяти по представлениям на основе tracemalloc.
+
+Трассировка включается только на время выбранного запроса, поэтому
+остальные запросы не платят за неё. tracemalloc общий на процесс:
+аллокации соседних потоков за это время тоже попадут в отчёт.
+
+Если задан MEMORY_TRACKING_DIR, каждый процесс после замера пишет
+свои данные в <pid>.json в этом каталоге, а отчёт складывает файлы
+всех процессов, как /metrics (core/metrics.py).
+"""
+import glob
+import json
+import os
+import threading
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+
+TOP_LINES = 20
+
+# Занят, пока идёт трассировка: её одновременно ведёт один запрос.
+_lock = threading.Lock()
+# Охраняет накопленные замеры процесса.
+_report_lock = threading.Lock()
+_state = {'pid': None, 'report': {}}
+
+
+def track(run):
+    """
+    Выполняет run() под tracemalloc. Возвращает результат и замер:
+    пиковую память и статистику оставшихся после запроса аллокаций
+    по строкам кода. Если трассировка уже занята, замер равен None.
+    """
+    if tracemalloc.is_tracing() or not _lock.acquire(blocking=False):
+        return run(), None
+    try:
+        tracemalloc.start(settings.MEMORY_TRACKING_FRAMES)
+        try:
+            result = run()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+        finally:
+            tracemalloc.stop()
+    finally:
+        _lock.release()
+    return result, (peak, snapshot.statistics('lineno'))
+
+
+def _current():
+    # После fork воркер начинает со своих пустых замеров.
+    if _state['pid'] != os.getpid():
+        _state.update(pid=os.getpid(), report={})
+    return _state['report']
+
+
+def add_sample(view_name, peak, statistics):
+    lines = Counter()
+    for stat in statistics[:TOP_LINES]:
+        frame = stat.traceback[0]
+        lines[f'{frame.filename}:{frame.lineno}'] += stat.size
+    with _report_lock:
+        entry = _current().setdefault(view_name, {
+            'samples': 0,
+            'peak_max': 0,
+            'retained_total': 0,
+            'lines': {},
+        })
+        entry['samples'] += 1
+        entry['peak_max'] = max(entry['peak_max'], peak)
+        entry['retained_total'] += sum(stat.size for stat in statistics)
+        entry['lines'] = dict(
+            (Counter(entry['lines']) + lines).most_common(TOP_LINES)
+        )
+        if settings.MEMORY_TRACKING_DIR:
+            # Под блокировкой: иначе два потока писали бы один .tmp.
+            dump(json.dumps(_current()))
+
+
+def dump(data):
+    """Атомарно заменяет файл процесса: читатель не увидит половину."""
+    directory = settings.MEMORY_TRACKING_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _merge(merged, data):
+    for view_name, entry in data.items():
+        total = merged.setdefault(view_name, {
+            'samples': 0,
+            'peak_max': 0,
+            'retained_total': 0,
+            'lines': Counter(),
+        })
+        total['samples'] += entry['samples']
+        total['peak_max'] = max(total['peak_max'], entry['peak_max'])
+        total['retained_total'] += entry['retained_total']
+        total['lines'].update(entry['lines'])
+    return merged
+
+
+def collect():
+    """Замеры всех процессов или, без каталога, только этого."""
+    with _report_lock:
+        merged = _merge({}, _current())
+    directory = settings.MEMORY_TRACKING_DIR
+    if not directory:
+        return merged
+    own = os.path.join(directory, f'{os.getpid()}.json')
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if path == own:
+            continue
+        try:
+            with open(path) as file:
+                _merge(merged, json.load(file))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+def report():
+    """Отчёт по представлениям, сначала самые прожорливые."""
+    rows = []
+    for view_name, entry in collect().items():
+        rows.append({
+            'view': view_name,
+            'samples': entry['samples'],
+            'peak_max': entry['peak_max'],
+            'retained_avg': entry['retained_total'] // entry['samples'],
+            'lines': entry['lines'].most_common(TOP_LINES),
+        })
+    return sorted(rows, key=lambda row: row['peak_max'], reverse=True)
@@ -0,0 +1,192 @@
+"""
+Метрики в текстовом формате Prometheus.
+
+Каждый процесс копит метрики в памяти и раз в METRICS_FLUSH_SECONDS
+сбрасывает их в свой файл в METRICS_DIR. Эндпоинт /metrics складывает
+файлы всех процессов, так что воркеры WSGI суммируются без внешнего
+коллектора. Каталог нужно очищать при выкладке.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+    'yatube_view_latency_seconds': (
+        'histogram', 'Время ответа представления.'
+    ),
+    'yatube_view_db_queries_total': (
+        'counter', 'Число SQL-запросов представления.'
+    ),
+    'yatube_cache_requests_total': (
+        'counter', 'Обращения к кешу по результату (hit/miss).'
+    ),
+    'yatube_thumbnail_generation_seconds': (
+        'histogram', 'Время генерации миниатюры.'
+    ),
+    'yatube_objects_created_total': (
+        'counter', 'Созданные посты, комментарии и подписки.'
+    ),
+    'yatube_writes_total': (
+        'counter', 'Записи, выполненные через очередь записей.'
+    ),
+    'yatube_write_commits_total': (
+        'counter', 'Транзакции очереди записей (пачки записей).'
+    ),
+    'yatube_write_timeouts_total': (
+        'counter', 'Записи, не дождавшиеся потока-писателя.'
+    ),
+    'yatube_db_busy_retries_total': (
+        'counter', 'Повторы запросов к SQLite из-за блокировки базы.'
+    ),
+}
+
+_lock = threading.Lock()
+_state = {'pid': None}
+
+
+def _reset():
+    _state.update(
+        pid=os.getpid(),
+        filename=f'{os.getpid()}-{time.time_ns()}.json',
+        flushed=time.monotonic(),
+        counters={},
+        histograms={},
+    )
+
+
+def _current():
+    # После fork воркер начинает со своего пустого состояния и файла.
+    if _state['pid'] != os.getpid():
+        _reset()
+    return _state
+
+
+def _labels_key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _labels_key(labels)
+    with _lock:
+        series = _current()['counters'].setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    key = _labels_key(labels)
+    with _lock:
+        series = _current()['histograms'].setdefault(name, {})
+        # Счётчики корзин, затем сумма и общее число наблюдений.
+        values = series.setdefault(key, [0] * (len(BUCKETS) + 2))
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                values[index] += 1
+        values[-2] += value
+        values[-1] += 1
+
+
+def flush(force=False):
+    """Сбрасывает метрики процесса в его файл, не чаще интервала."""
+    with _lock:
+        state = _current()
+        now = time.monotonic()
+        if not state['counters'] and not state['histograms']:
+            return
+        elapsed = now - state['flushed']
+        if not force and elapsed < settings.METRICS_FLUSH_SECONDS:
+            return
+        state['flushed'] = now
+        data = json.dumps({
+            'counters': state['counters'],
+            'histograms': state['histograms'],
+        })
+        path = os.path.join(settings.METRICS_DIR, state['filename'])
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        file.write(data)
+    os.replace(path + '.tmp', path)
+
+
+atexit.register(flush, force=True)
+
+
+def collect():
+    """Складывает метрики всех процессов."""
+    flush(force=True)
+    counters, histograms = {}, {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, series in data['counters'].items():
+            merged = counters.setdefault(name, {})
+            for key, value in series.items():
+                merged[key] = merged.get(key, 0) + value
+        for name, series in data['histograms'].items():
+            merged = histograms.setdefault(name, {})
+            for key, values in series.items():
+                total = merged.setdefault(key, [0] * len(values))
+                for index, value in enumerate(values):
+                    total[index] += value
+    return counters, histograms
+
+
+def _escape(value):
+    """Экранирование значения метки в текстовом формате Prometheus."""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(key, **extra):
+    pairs = json.loads(key) + sorted(extra.items())
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(name, _escape(value)) for name, value in pairs
+    )
+    return '{' + body + '}'
+
+
+def render():
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f'{name}{_format_labels(key)} {value}')
+            continue
+        for key, values in sorted(histograms.get(name, {}).items()):
+            # Корзины хранятся уже накопленными: value <= le.
+            for bound, count in zip(BUCKETS, values):
+                labels = _format_labels(key, le=bound)
+                lines.append(f'{name}_bucket{labels} {count}')
+            labels = _format_labels(key, le='+Inf')
+            lines.append(f'{name}_bucket{labels} {values[-1]}')
+            lines.append(f'{name}_sum{_format_labels(key)} {values[-2]}')
+            lines.append(f'{name}_count{_format_labels(key)} {values[-1]}')
+    hits, misses = 0, 0
+    for key, value in counters.get('yatube_cache_requests_total', {}).items():
+        if dict(json.loads(key)).get('result') == 'hit':
+            hits += value
+        else:
+            misses += value
+    lines.append('# HELP yatube_cache_hit_ratio Доля попаданий в кеш.')
+    lines.append('# TYPE yatube_cache_hit_ratio gauge')
+    ratio = hits / (hits + misses) if hits + misses else 0
+    lines.append(f'yatube_cache_hit_ratio {ratio}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Ошибки (например, 404 ещё не созданного профиля) в общий кеш
+# не попадают: их никто не сбросит, когда страница появится.
+PUBLIC_STATUSES = (200, 304)
+
+
+class AnonymousCacheMiddleware:
+    """
+    Отдаёт страницы из ANONYMOUS_CACHE_VIEWS гостям без сессии так,
+    чтобы их мог хранить общий кеш (обратный прокси, CDN).
+
+    Если в запросе нет cookie сессии, пользователь сразу считается
+    анонимным и сессия не читается: ответ не получает Set-Cookie,
+    а с Vary: Cookie и Cache-Control: public, s-maxage прокси отдаёт
+    его всем гостям. Браузер при max-age=0 каждый раз переспрашивает
+    сервер и получает 304 по ETag. Всем остальным эти страницы,
+    а также ответы с кодом не из PUBLIC_STATUSES, отдаются
+    с Cache-Control: private. Кеш представления (cache_page) должен
+    различать запросы по Cookie, иначе гость получит страницу,
+    отрисованную для пользователя. Стоит в списке до
+    SessionMiddleware, чтобы видеть cookie, которые ставят внутренние
+    слои.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._anonymous_cache = None
+        response = self.get_response(request)
+        if request._anonymous_cache is None:
+            return response
+        if (request._anonymous_cache and not response.cookies
+                and response.status_code in PUBLIC_STATUSES):
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.ANONYMOUS_CACHE_SECONDS,
+            )
+        else:
+            patch_cache_control(response, private=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method not in SAFE_METHODS
+                or request.resolver_match.view_name
+                not in settings.ANONYMOUS_CACHE_VIEWS):
+            return None
+        request._anonymous_cache = (
+            settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+        if request._anonymous_cache:
+            # Без обращения к сессии, которое сделал бы ленивый
+            # request.user из AuthenticationMiddleware.
+            request.user = AnonymousUser()
+        return None
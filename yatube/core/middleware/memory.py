@@ -0,0 +1,27 @@
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import memory
+
+
+class MemoryTrackingMiddleware:
+    """
+    Снимает tracemalloc-замеры для доли MEMORY_TRACKING_SAMPLE_RATE
+    запросов и копит отчёт по представлениям.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_TRACKING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.MEMORY_TRACKING_SAMPLE_RATE:
+            return self.get_response(request)
+        response, sample = memory.track(lambda: self.get_response(request))
+        match = request.resolver_match
+        if sample is not None and match is not None:
+            memory.add_sample(match.view_name, *sample)
+        return response
@@ -0,0 +1,29 @@
+import time
+
+from core import metrics
+from core.queries import record_queries
+
+
+class MetricsMiddleware:
+    """Собирает время ответа и число запросов к БД по представлениям."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        if match is not None:
+            metrics.observe(
+                'yatube_view_latency_seconds', elapsed, view=match.view_name
+            )
+            metrics.inc(
+                'yatube_view_db_queries_total',
+                recorder.count,
+                view=match.view_name
+            )
+        metrics.flush()
+        return response
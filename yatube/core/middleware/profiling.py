@@ -0,0 +1,63 @@
+import cProfile
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+
+def rotate(directory, max_bytes):
+    """Удаляет самые старые профили, пока каталог больше max_bytes."""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует долю PROFILER_SAMPLE_RATE запросов и любые запросы
+    сотрудников с заголовком X-Profile. Результат пишется в pstats-файл
+    в PROFILER_DIR/<представление>/, по нему строятся flamegraph
+    (например, flameprof или snakeviz).
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if random.random() < settings.PROFILER_SAMPLE_RATE:
+            return True
+        return (
+            'HTTP_X_PROFILE' in request.META
+            and request.user.is_authenticated
+            and request.user.is_staff
+        )
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        response = profile.runcall(self.get_response, request)
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        directory = os.path.join(
+            settings.PROFILER_DIR, view_name.replace(':', '.')
+        )
+        os.makedirs(directory, exist_ok=True)
+        filename = f'{time.time_ns()}-{os.getpid()}.prof'
+        profile.dump_stats(os.path.join(directory, filename))
+        rotate(settings.PROFILER_DIR, settings.PROFILER_MAX_BYTES)
+        response['X-Profile-File'] = filename
+        return response
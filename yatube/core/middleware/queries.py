@@ -0,0 +1,51 @@
+import logging
+import time
+
+from django.conf import settings
+
+from core.queries import (
+    QueryBudgetExceeded,
+    check_budget,
+    record_queries,
+    slow_query_logger,
+    wrap_queries,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Записывает SQL-запросы каждого запроса и сверяет их с бюджетом
+    представления. В строгом режиме превышение бюджета — исключение,
+    иначе предупреждение в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        if match is None:
+            return response
+        problems = check_budget(match.view_name, recorder, elapsed)
+        if problems and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded('; '.join(problems))
+        for problem in problems:
+            logger.warning(problem)
+        return response
+
+
+class SlowQueryMiddleware:
+    """Пишет в лог медленные запросы с кадром и шаблоном-источником."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with wrap_queries(slow_query_logger):
+            return self.get_response(request)
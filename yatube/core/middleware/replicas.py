@@ -0,0 +1,44 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware:
+    """
+    Направляет чтения представлений из REPLICA_VIEWS на реплики.
+    После изменяющего запроса (или GET к представлению из
+    REPLICA_PIN_VIEWS) пользователь на REPLICA_PIN_SECONDS
+    закрепляется за основной базой, чтобы видеть свои записи,
+    пока реплики их не догнали.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._replica_reads = ExitStack()
+        request._replica_pin = request.method not in SAFE_METHODS
+        with request._replica_reads:
+            response = self.get_response(request)
+        if request._replica_pin and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE_NAME, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        if view_name in settings.REPLICA_PIN_VIEWS:
+            request._replica_pin = True
+        if (request.method in SAFE_METHODS
+                and view_name in settings.REPLICA_VIEWS
+                and settings.REPLICA_PIN_COOKIE_NAME not in request.COOKIES):
+            request._replica_reads.enter_context(replica_reads())
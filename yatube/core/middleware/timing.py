@@ -0,0 +1,57 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+
+from core import timing
+from core.queries import record_queries
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('db', 'template', 'cache', 'thumbnail')
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет фазы запроса (SQL, шаблоны, кеш, миниатюры) и отдаёт их
+    в заголовке Server-Timing. Медленные запросы пишутся в лог строкой
+    JSON. Фазы пересекаются: template включает вложенные запросы к БД.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        phases, token = timing.start()
+        start = time.perf_counter()
+        try:
+            with record_queries() as recorder:
+                response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        total = time.perf_counter() - start
+        phases['db'] = (recorder.duration, recorder.count)
+        metrics = [
+            f'{phase};dur={phases[phase][0] * 1000:.1f}'
+            for phase in PHASES if phase in phases
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(metrics)
+        if total * 1000 >= settings.SERVER_TIMING_LOG_MS:
+            match = request.resolver_match
+            logger.info(json.dumps({
+                'view': match.view_name if match else None,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                **{
+                    f'{phase}_ms': round(duration * 1000, 1)
+                    for phase, (duration, _) in phases.items()
+                },
+                **{
+                    f'{phase}_count': count
+                    for phase, (_, count) in phases.items()
+                },
+            }))
+        return response
@@ -0,0 +1,24 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.shortcuts import render
+
+from core.writes import WriteQueueTimeout
+
+
+class WriteQueueMiddleware:
+    """Отвечает 503, если запись не дождалась потока-писателя."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, WriteQueueTimeout):
+            return None
+        response = render(request, 'core/503.html',
+                          status=HTTPStatus.SERVICE_UNAVAILABLE)
+        response['Retry-After'] = settings.WRITE_QUEUE_TIMEOUT
+        return response
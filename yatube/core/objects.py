@@ -0,0 +1,78 @@
+"""
+Кеш отдельных объектов для частых поисков по slug, username и id.
+
+Объект читается из кеша, а при промахе из базы и кладётся в кеш на
+OBJECT_CACHE_SECONDS. Сигналы сохранения и удаления сбрасывают ключи
+самого объекта (см. posts/signals.py), а при переименовании группы
+или пользователя — и ключи под прежним slug и username. Связанные
+объекты, загруженные через select_related, при этом не отслеживаются
+и могут отставать не дольше времени жизни кеша.
+
+Кеш LocMem живёт в памяти процесса, и сигнал сбрасывает его только
+там, где прошла запись. Остальные воркеры видят изменение не позже
+чем через OBJECT_CACHE_SECONDS, поэтому время жизни короткое; при
+общем бэкенде кеша (memcached, Redis) ограничение снимается.
+Представления, которые изменяют объект, читают его из базы.
+
+Подтверждённые промахи (404) запоминаются в отдельном кеше 'negative'
+на NEGATIVE_CACHE_SECONDS: поток запросов к несуществующим адресам
+не ходит в базу и, ограниченный своим MAX_ENTRIES, не вытесняет
+из основного кеша настоящие объекты. Создание объекта сбрасывает
+его ключ в обоих кешах.
+"""
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models.base import ModelBase
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+
+def object_key(model, **lookup):
+    parts = [f'{name}={value}' for name, value in sorted(lookup.items())]
+    return f'object:{model._meta.label_lower}:' + ':'.join(parts)
+
+
+def cached_object(key, load):
+    """
+    Объект по ключу, а при промахе — результат load(). Http404 из
+    load() запоминается и повторяется без обращения к базе.
+    """
+    obj = cache.get(key)
+    if obj is not None:
+        return obj
+    negative = caches['negative']
+    if negative.get(key):
+        raise Http404
+    try:
+        obj = load()
+    except Http404:
+        negative.set(key, True, settings.NEGATIVE_CACHE_SECONDS)
+        raise
+    cache.set(key, obj, settings.OBJECT_CACHE_SECONDS)
+    return obj
+
+
+def get_cached_or_404(klass, **lookup):
+    """get_object_or_404 с кешем; klass — модель или выборка."""
+    model = klass if isinstance(klass, ModelBase) else klass.model
+    return cached_object(
+        object_key(model, **lookup),
+        lambda: get_object_or_404(klass, **lookup),
+    )
+
+
+def forget(model, field, values):
+    """
+    Сбрасывает кешированные объекты model с field из values. Ключи
+    удаляются сразу и ещё раз после коммита: иначе параллельный запрос
+    успеет положить в кеш строку, которая ещё не изменилась.
+    """
+    keys = [object_key(model, **{field: value}) for value in values]
+
+    def delete():
+        cache.delete_many(keys)
+        caches['negative'].delete_many(keys)
+
+    delete()
+    transaction.on_commit(delete)
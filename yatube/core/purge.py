@@ -0,0 +1,48 @@
+"""
+Сброс страниц в общих кешах (обратный прокси, CDN) после записи.
+
+Гостевые страницы отдаются с Cache-Control: public (см.
+core/middleware/anonymous.py) и живут в кеше прокси до
+ANONYMOUS_CACHE_SECONDS. Чтобы изменения были видны раньше, после
+коммита на каждый адрес из CACHE_PURGE_URLS уходит запрос PURGE
+с путём страницы. Прокси должен сбрасывать и варианты пути
+с параметрами (?page=...). Запросы идут в фоновом потоке и ответ
+не задерживают; ошибки только пишутся в лог.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='purge')
+
+
+def enabled():
+    return bool(settings.CACHE_PURGE_URLS)
+
+
+def send(path):
+    for base in settings.CACHE_PURGE_URLS:
+        url = base.rstrip('/') + path
+        try:
+            urlopen(Request(url, method='PURGE'),
+                    timeout=settings.CACHE_PURGE_TIMEOUT).close()
+        except OSError as error:
+            logger.warning('Не удалось сбросить %s: %s', url, error)
+
+
+def purge(paths):
+    """Сбрасывает страницы paths после коммита текущей транзакции."""
+    if not enabled():
+        return
+    paths = sorted(set(paths))
+
+    def submit():
+        for path in paths:
+            _executor.submit(send, path)
+
+    transaction.on_commit(submit)
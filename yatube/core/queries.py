@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template.base import Node
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST = re.compile(r'\bIN \([^)]*\)', re.IGNORECASE)
+
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+PARAM_REPR_LENGTH = 100
+
+slow_logger = logging.getLogger('core.slow_queries')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize(sql):
+    """Форма запроса: литералы заменены на `?`, списки IN свёрнуты."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = IN_LIST.sub('IN (...)', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper, записывающая запросы."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeated(self, threshold=None):
+        """Формы запросов, повторившиеся не меньше threshold раз (N+1)."""
+        if threshold is None:
+            threshold = settings.N_PLUS_ONE_THRESHOLD
+        shapes = Counter(normalize(sql) for sql, _ in self.queries)
+        return {
+            shape: count for shape, count in shapes.items()
+            if count >= threshold
+        }
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    """Ставит execute_wrapper на все соединения внутри блока."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+def record_queries():
+    """Записывает запросы ко всем базам внутри блока."""
+    return wrap_queries(QueryRecorder())
+
+
+def replay(queries):
+    """
+    Добавляет запросы, выполненные за текущий поток в другом (см.
+    core/writes.py), ко всем записывающим обёрткам этого потока.
+    """
+    for wrapper in connections[DEFAULT_DB_ALIAS].execute_wrappers:
+        if isinstance(wrapper, QueryRecorder):
+            wrapper.queries.extend(queries)
+
+
+def check_budget(view_name, recorder, elapsed):
+    """
+    Сверяет запросы и время ответа с бюджетом из QUERY_BUDGETS.
+    Возвращает список нарушений, пустой если всё в порядке.
+    """
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is None:
+        return []
+    problems = []
+    if recorder.count > budget['queries']:
+        problems.append(
+            f'{view_name}: {recorder.count} запросов '
+            f'при бюджете {budget["queries"]}'
+        )
+    if elapsed * 1000 > budget['ms']:
+        problems.append(
+            f'{view_name}: {elapsed * 1000:.0f} мс '
+            f'при бюджете {budget["ms"]} мс'
+        )
+    for shape, count in recorder.repeated().items():
+        problems.append(f'{view_name}: N+1, {count} раз `{shape}`')
+    return problems
+
+
+def find_callers(frame):
+    """
+    Ищет по стеку ближайший кадр кода проекта (кроме core) и узел
+    шаблона, отрисовка которого вызвала запрос.
+    """
+    caller, template = None, None
+    while frame is not None and (caller is None or template is None):
+        code = frame.f_code
+        filename = code.co_filename
+        if (caller is None
+                and filename.startswith(settings.BASE_DIR)
+                and not filename.startswith(CORE_DIR)):
+            relative = os.path.relpath(filename, settings.BASE_DIR)
+            caller = f'{relative}:{frame.f_lineno} in {code.co_name}'
+        node = frame.f_locals.get('self')
+        if (template is None
+                and code.co_name == 'render_annotated'
+                and isinstance(node, Node)):
+            lineno = node.token.lineno if node.token else '?'
+            template = f'{node.origin.template_name}:{lineno}'
+        frame = frame.f_back
+    return caller, template
+
+
+class SlowQueryLogger:
+    """
+    Обёртка для connection.execute_wrapper: пишет в лог запросы
+    дольше SLOW_QUERY_MS строкой JSON. Одна и та же форма запроса
+    логируется не чаще раза в SLOW_QUERY_LOG_INTERVAL секунд,
+    пропущенные повторы учитываются в поле suppressed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_logged = {}
+        self.suppressed = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                self.log(sql, params, many, duration)
+
+    def allow(self, shape):
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_logged.get(shape)
+            interval = settings.SLOW_QUERY_LOG_INTERVAL
+            if last is not None and now - last < interval:
+                self.suppressed[shape] += 1
+                return None
+            if len(self.last_logged) > 1000:
+                self.last_logged.clear()
+            self.last_logged[shape] = now
+            return self.suppressed.pop(shape, 0)
+
+    def log(self, sql, params, many, duration):
+        shape = normalize(sql)
+        suppressed = self.allow(shape)
+        if suppressed is None:
+            return
+        caller, template = find_callers(sys._getframe(1))
+        if many or params is None:
+            params = []
+        slow_logger.warning(json.dumps({
+            'event': 'slow_query',
+            'sql': sql,
+            'params': [repr(param)[:PARAM_REPR_LENGTH] for param in params],
+            'duration_ms': round(duration * 1000, 2),
+            'caller': caller,
+            'template': template,
+            'suppressed': suppressed,
+        }, ensure_ascii=False))
+
+
+slow_query_logger = SlowQueryLogger()
@@ -0,0 +1,46 @@
+"""
+Маршрутизация чтений на реплики.
+
+Запись и все чтения по умолчанию идут в основную базу. Чтения моделей
+из REPLICA_APPS уходят на случайную реплику из DATABASE_REPLICAS только
+внутри replica_reads(): его включает ReplicaMiddleware для лент.
+Сессии и пользователи всегда читаются из основной базы: только что
+созданная сессия на реплику ещё не попала.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (_replica_reads.get()
+                and settings.DATABASE_REPLICAS
+                and model._meta.app_label in settings.REPLICA_APPS):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Объект, прочитанный с реплики, сохраняется в основную базу.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему вместе с копией основной базы.
+        return db not in settings.DATABASE_REPLICAS
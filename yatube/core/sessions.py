@@ -0,0 +1,34 @@
+"""
+Сессии в подписанных cookie (SESSION_ENGINE = 'core.sessions').
+
+Данные сессии хранятся у клиента, поэтому запросы пользователей
+не читают и не пишут таблицу django_session и не борются с постами
+за блокировку записи. Выход из аккаунта удаляет cookie только
+у самого клиента; украденная cookie отзывается сменой пароля
+(хеш пароля входит в сессию).
+
+Сессия считается изменённой, только если её содержимое отличается
+от пришедшего в запросе: повторная запись тех же значений не
+отправляет клиенту новую cookie.
+"""
+from django.contrib.sessions.backends import signed_cookies
+
+
+class SessionStore(signed_cookies.SessionStore):
+    _loaded = None
+
+    def load(self):
+        data = super().load()
+        self._loaded = self.dump(data)
+        return data
+
+    def dump(self, data):
+        return self.serializer().dumps(data)
+
+    @property
+    def modified(self):
+        return self._modified and self.dump(self._session) != self._loaded
+
+    @modified.setter
+    def modified(self, value):
+        self._modified = value
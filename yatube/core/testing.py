@@ -0,0 +1,21 @@
+import time
+
+from django.conf import settings
+
+from core.queries import check_budget, record_queries
+
+
+class QueryBudgetMixin:
+    """Проверка бюджета запросов представления для TestCase."""
+
+    def assertWithinBudget(self, client, url):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = client.get(url)
+        elapsed = time.perf_counter() - start
+        view_name = response.resolver_match.view_name
+        self.assertIn(view_name, settings.QUERY_BUDGETS,
+                      f'Для {view_name} не задан бюджет запросов')
+        problems = check_budget(view_name, recorder, elapsed)
+        self.assertEqual(problems, [], '\n'.join(problems))
+        return response
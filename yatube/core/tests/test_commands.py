@@ -0,0 +1,46 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class BenchmarkCommandTest(TransactionTestCase):
+    # Запросы идут из рабочих потоков, поэтому данные нужно закоммитить.
+
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.create(text='Пост', author=author, group=group)
+        Follow.objects.create(user=reader, author=author)
+
+    def test_results_are_written(self):
+        """Проверяем, что прогон пишет задержки и число запросов."""
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        output.close()
+        self.addCleanup(os.remove, output.name)
+        # Один поток: в тестовой базе в памяти (shared cache) чтение
+        # таблицы из другого соединения сразу роняет запись с "database
+        # table is locked", без ожидания, как было бы с файлом базы.
+        call_command(
+            'benchmark', views='profile,post_detail,add_comment',
+            requests=5, concurrency=1, output=output.name, stdout=StringIO(),
+        )
+        with open(output.name) as file:
+            run = json.load(file)
+        self.assertEqual(run['dataset']['post'], 1)
+        for view in ('profile', 'post_detail', 'add_comment'):
+            result = run['views'][view]
+            self.assertEqual(result['errors'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_per_request'], 0)
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.counting import CachedCountPaginator, count, count_key, invalidate
+from posts import deletion
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(COUNT_EXACT_THRESHOLD=3)
+class CachedCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for i in range(4):
+            Post.objects.create(text=f'Пост {i}', author=cls.user,
+                                group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_small_selection_is_counted_exactly(self):
+        """Проверяем, что выборка меньше порога считается каждый раз."""
+        posts = Post.objects.filter(text='Пост 1')
+        self.assertEqual(count(posts), 1)
+        Post.objects.create(text='Пост 1', author=self.user)
+        self.assertEqual(count(posts), 2)
+
+    def test_large_selection_is_cached_and_adjusted(self):
+        """Проверяем, что счётчик большой выборки поправляют сигналы."""
+        key = count_key(Post, group_id=self.group.id)
+        self.assertEqual(count(self.group.posts.all(), key), 4)
+        post = Post.objects.create(text='Новый', author=self.user,
+                                   group=self.group)
+        with self.assertNumQueries(0):
+            self.assertEqual(count(self.group.posts.all(), key), 5)
+        post.delete()
+        self.assertEqual(count(self.group.posts.all(), key), 4)
+
+    def test_invalidate_drops_counts_after_bulk_update(self):
+        """Проверяем, что invalidate сбрасывает счётчики после UPDATE."""
+        key = count_key(Post, group_id=self.group.id)
+        self.assertEqual(count(self.group.posts.all(), key), 4)
+        self.assertEqual(count(Post.objects.filter(group=self.group)), 4)
+        Post.objects.update(group=None)
+        self.assertEqual(count(self.group.posts.all(), key), 4)
+        invalidate(Post, group_id=[self.group.id])
+        self.assertEqual(count(self.group.posts.all(), key), 0)
+        self.assertEqual(count(Post.objects.filter(group=self.group)), 0)
+
+    def test_paginator_uses_cached_count(self):
+        """Проверяем, что повторный запрос страницы не считает строки."""
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 2).count, 4
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 2).count, 4
+            )
+
+    def test_admin_changelist_uses_cached_count(self):
+        """Проверяем, что список постов в админке не считает всю таблицу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 4)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_empty_selections_count_as_zero(self):
+        """Проверяем, что .none() и пустой __in считаются без ошибки."""
+        self.assertEqual(count(Post.objects.none()), 0)
+        self.assertEqual(count(Post.objects.filter(id__in=[])), 0)
+
+    def test_hidden_posts_are_not_counted(self):
+        """Проверяем, что посты, ждущие удаления, не попадают в число."""
+        url = reverse('posts:group_posts', args=['group'])
+        self.assertEqual(
+            self.client.get(url).context['page_obj'].paginator.count, 4
+        )
+        deletion.schedule(Post.objects.first())
+        self.assertEqual(
+            self.client.get(url).context['page_obj'].paginator.count, 3
+        )
@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.backends.sqlite3.base import Database, retry_busy
+
+
+class PragmaTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profile_is_applied(self):
+        """Проверяем, что прагмы профиля выполнены на соединении."""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+
+@mock.patch('core.db.backends.sqlite3.base.time.sleep')
+class RetryBusyTest(SimpleTestCase):
+    def failing(self, times, message='database is locked'):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= times:
+                raise Database.OperationalError(message)
+            return 'ok'
+        return func, calls
+
+    def test_busy_is_retried(self, sleep):
+        """Проверяем, что запрос повторяется, пока база заблокирована."""
+        func, calls = self.failing(2)
+        self.assertEqual(retry_busy(func, 5, 0.05), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+        # Задержка растёт, но остаётся случайной в своих пределах.
+        self.assertLessEqual(sleep.call_args_list[1][0][0], 0.1)
+
+    def test_retries_are_limited(self, sleep):
+        """Проверяем, что после исчерпания попыток ошибка уходит наверх."""
+        func, calls = self.failing(10)
+        with self.assertRaises(Database.OperationalError):
+            retry_busy(func, 3, 0.05)
+        self.assertEqual(len(calls), 4)
+
+    def test_other_errors_are_not_retried(self, sleep):
+        """Проверяем, что ошибки кроме блокировки не повторяются."""
+        func, calls = self.failing(1, 'no such table: posts_post')
+        with self.assertRaises(Database.OperationalError):
+            retry_busy(func, 5, 0.05)
+        self.assertEqual(len(calls), 1)
+        sleep.assert_not_called()
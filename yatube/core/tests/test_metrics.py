@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+TEMP_METRICS_DIR = tempfile.mkdtemp()
+
+User = get_user_model()
+
+
+@override_settings(
+    METRICS_DIR=TEMP_METRICS_DIR, METRICS_ALLOWED_IPS=['127.0.0.1']
+)
+class MetricsViewTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_metrics_include_views_and_created_objects(self):
+        """Проверяем метрики представлений и созданных объектов."""
+        user = User.objects.create(username='auth')
+        Post.objects.create(text='Тестовый пост', author=user)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        content = response.content.decode()
+        self.assertIn(
+            'yatube_view_latency_seconds_count{view="posts:index"}', content
+        )
+        self.assertIn(
+            'yatube_objects_created_total{model="post"}', content
+        )
+        self.assertIn('yatube_cache_requests_total{result="miss"}', content)
+
+    def test_metrics_sum_all_processes(self):
+        """Проверяем, что метрики других воркеров суммируются."""
+        self.client.get(reverse('metrics'))
+        before = self.client.get(reverse('metrics')).content.decode()
+        key = json.dumps([['model', 'worker']])
+        with open(os.path.join(TEMP_METRICS_DIR, 'other.json'), 'w') as file:
+            json.dump({
+                'counters': {'yatube_objects_created_total': {key: 5}},
+                'histograms': {},
+            }, file)
+        after = self.client.get(reverse('metrics')).content.decode()
+        line = 'yatube_objects_created_total{model="worker"}'
+        self.assertNotIn(line, before)
+        self.assertIn(f'{line} 5', after)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_are_closed_to_other_addresses(self):
+        """Проверяем, что метрики видят только сборщик и персонал."""
+        url = reverse('metrics')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        self.assertEqual(
+            self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code,
+            HTTPStatus.OK
+        )
+        self.client.force_login(User.objects.create(username='user'))
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        self.client.force_login(
+            User.objects.create(username='staff', is_staff=True)
+        )
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.OK)
+
+    def test_label_values_are_escaped(self):
+        """Проверяем экранирование косой, перевода строки и кавычек."""
+        metrics.inc('yatube_objects_created_total', model='a\\b"c\nd')
+        self.assertIn(
+            'yatube_objects_created_total{model="a\\\\b\\"c\\nd"} 1',
+            metrics.render()
+        )
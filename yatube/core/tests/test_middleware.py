@@ -0,0 +1,192 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import memory
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Проверяем фазы в заголовке Server-Timing."""
+        response = self.client.get(reverse('posts:index'))
+        phases = [
+            metric.split(';')[0]
+            for metric in response['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(phases, ['db', 'template', 'cache', 'total'])
+
+    def test_cached_page_skips_template(self):
+        """Проверяем, что страница из кеша не отрисовывает шаблон."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('template;', response['Server-Timing'])
+        self.assertIn('cache;', response['Server-Timing'])
+
+
+@override_settings(PROFILER_ENABLED=True, PROFILER_SAMPLE_RATE=0)
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir, True)
+        cache.clear()
+
+    def test_staff_header_writes_profile(self):
+        """Проверяем профиль запроса сотрудника с заголовком."""
+        self.client.force_login(self.staff)
+        with self.settings(PROFILER_DIR=self.profiles_dir):
+            response = self.client.get(
+                reverse('posts:index'), HTTP_X_PROFILE='1'
+            )
+        path = os.path.join(
+            self.profiles_dir, 'posts.index', response['X-Profile-File']
+        )
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+    def test_header_ignored_for_regular_user(self):
+        """Проверяем, что обычный пользователь не включает профиль."""
+        self.client.force_login(self.user)
+        with self.settings(PROFILER_DIR=self.profiles_dir):
+            response = self.client.get(
+                reverse('posts:index'), HTTP_X_PROFILE='1'
+            )
+        self.assertFalse(response.has_header('X-Profile-File'))
+        self.assertEqual(os.listdir(self.profiles_dir), [])
+
+    def test_rotation_keeps_directory_bounded(self):
+        """Проверяем, что старые профили удаляются по размеру."""
+        self.client.force_login(self.staff)
+        with self.settings(PROFILER_DIR=self.profiles_dir,
+                           PROFILER_MAX_BYTES=1):
+            self.client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+            self.client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertEqual(
+            os.listdir(os.path.join(self.profiles_dir, 'posts.index')), []
+        )
+
+
+@override_settings(MEMORY_TRACKING_ENABLED=True,
+                   MEMORY_TRACKING_SAMPLE_RATE=1)
+class MemoryTrackingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_report_lists_sampled_views(self):
+        """Проверяем, что замеры попадают в отчёт для сотрудников."""
+        self.client.get(reverse('posts:index'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('memory_report'))
+        views = [row['view'] for row in response.context['report']]
+        self.assertIn('posts:index', views)
+
+    def test_report_sums_process_files(self):
+        """Проверяем, что отчёт складывает замеры всех процессов."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(MEMORY_TRACKING_DIR=directory):
+            self.client.get(reverse('posts:index'))
+            own = os.path.join(directory, f'{os.getpid()}.json')
+            with open(own) as file:
+                samples = json.load(file)['posts:index']['samples']
+            with open(os.path.join(directory, '1.json'), 'w') as file:
+                json.dump({'posts:index': {
+                    'samples': 2, 'peak_max': 10 ** 12,
+                    'retained_total': 0, 'lines': {'other.py:1': 10 ** 12},
+                }}, file)
+            rows = {row['view']: row for row in memory.report()}
+        self.assertEqual(rows['posts:index']['samples'], samples + 2)
+        self.assertEqual(rows['posts:index']['peak_max'], 10 ** 12)
+        self.assertIn(('other.py:1', 10 ** 12), rows['posts:index']['lines'])
+        self.assertEqual(sorted(os.listdir(directory)), [
+            '1.json', f'{os.getpid()}.json'
+        ])
+
+    def test_report_is_staff_only(self):
+        """Проверяем, что отчёт недоступен анонимам."""
+        response = self.client.get(reverse('memory_report'))
+        self.assertEqual(response.status_code, 302)
+
+
+class AnonymousCacheMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_are_public(self):
+        """Проверяем, что гостевые страницы можно хранить в общем кеше."""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:profile', args=['auth']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.cookies)
+                self.assertFalse(response.wsgi_request.session.accessed)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage=60', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_user_pages_are_private(self):
+        """Проверяем, что страницы пользователя не попадут в общий кеш."""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_user_page_is_not_replayed_to_guests(self):
+        """Проверяем, что гость не получит из кеша чужую главную."""
+        self.client.force_login(self.user)
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Выйти'
+        )
+        self.client.logout()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Выйти')
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_errors_are_private(self):
+        """Проверяем, что 404 не попадёт в общий кеш."""
+        response = self.client.get(reverse('posts:profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('public', response['Cache-Control'])
+
+    def test_csrf_token_endpoint(self):
+        """Проверяем выдачу токена CSRF отдельным запросом."""
+        response = self.client.get(reverse('csrf_token'))
+        self.assertTrue(response.json()['token'])
+        self.assertIn('csrftoken', response.cookies)
+        self.assertIn('max-age=0', response['Cache-Control'])
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.http import Http404
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.objects import get_cached_or_404
+from posts import moderation
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        caches['negative'].clear()
+
+    def tables(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return ' '.join(query['sql'] for query in queries)
+
+    def test_repeated_lookups_skip_database(self):
+        """Проверяем, что повторные поиски объектов не идут в базу."""
+        for url, table in (
+            (reverse('posts:post_detail', args=[self.post.id]),
+             '"posts_post"."id" = '),
+            (reverse('posts:group_posts', args=['group']),
+             '"posts_group"."slug" = '),
+            (reverse('posts:profile', args=['auth']),
+             '"auth_user"."username" = '),
+        ):
+            with self.subTest(url=url):
+                self.assertIn(table, self.tables(url))
+                self.assertNotIn(table, self.tables(url))
+
+    def test_save_and_delete_invalidate_cache(self):
+        """Проверяем, что сохранение и удаление сбрасывают кеш."""
+        self.assertEqual(
+            get_cached_or_404(Group, slug='group').title, 'Группа'
+        )
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(
+            get_cached_or_404(Group, slug='group').title, 'Новое название'
+        )
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.client.get(url)
+        self.post.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_bulk_update_invalidates_cache(self):
+        """Проверяем, что массовый перенос постов сбрасывает кеш."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.assertContains(self.client.get(url), 'Группа')
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        moderation.move_to_group(Post.objects.all(), other)
+        self.assertContains(self.client.get(url), 'Другая')
+
+    def test_misses_are_remembered_until_creation(self):
+        """Проверяем, что 404 запоминается и сбрасывается при создании."""
+        url = reverse('posts:profile', args=['newcomer'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertNotIn('"auth_user"."username" = ', self.tables(url))
+        User.objects.create_user(username='newcomer')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_rename_forgets_old_slug_and_username(self):
+        """Проверяем, что после переименования старый адрес не найдётся."""
+        get_cached_or_404(Group, slug='group')
+        get_cached_or_404(User, username='auth')
+        group = Group.objects.get(slug='group')
+        group.slug = 'renamed'
+        group.save()
+        user = User.objects.get(username='auth')
+        user.username = 'renamed'
+        user.save()
+        for model, lookup in ((Group, {'slug': 'group'}),
+                              (User, {'username': 'auth'})):
+            with self.subTest(model=model):
+                with self.assertRaises(Http404):
+                    get_cached_or_404(model, **lookup)
+
+    def test_edit_uses_fresh_post(self):
+        """Проверяем, что правка не затирает изменения устаревшей копией."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.client.get(url)
+        other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        Post.objects.filter(id=self.post.id).update(group=other)
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:post_edit', args=[self.post.id])
+        )
+        self.assertEqual(response.context['form'].initial['group'], other.id)
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import purge
+from posts import moderation
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(CACHE_PURGE_URLS=['http://proxy'])
+class PurgeTest(TransactionTestCase):
+    def setUp(self):
+        executor = mock.patch.object(purge, '_executor')
+        self.executor = executor.start()
+        self.addCleanup(executor.stop)
+        self.user = User.objects.create(username='auth')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.executor.reset_mock()
+
+    def purged(self):
+        paths = {call.args[1] for call in self.executor.submit.call_args_list}
+        self.executor.reset_mock()
+        return paths
+
+    def test_writes_purge_pages(self):
+        """Проверяем, какие страницы сбрасываются после записей."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        detail = reverse('posts:post_detail', args=[post.id])
+        self.assertEqual(self.purged(), {
+            reverse('posts:index'),
+            detail,
+            reverse('posts:group_posts', args=['group']),
+            reverse('posts:profile', args=['auth']),
+        })
+        Comment.objects.create(text='Комментарий', post=post,
+                               author=self.user)
+        self.assertEqual(self.purged(), {detail})
+        moderation.delete_comments(Comment.objects.all())
+        self.assertEqual(self.purged(), {detail})
+
+    def test_nothing_sent_without_proxies(self):
+        """Проверяем, что без CACHE_PURGE_URLS запросы не отправляются."""
+        with self.settings(CACHE_PURGE_URLS=[]):
+            Post.objects.create(text='Тестовый пост', author=self.user)
+        self.assertFalse(self.executor.submit.called)
@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import normalize, slow_query_logger
+from posts.models import Post
+
+User = get_user_model()
+
+
+class NormalizeTest(TestCase):
+    def test_literals_are_replaced(self):
+        """Проверяем, что запросы с разными значениями дают одну форму."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            normalize("SELECT * FROM t WHERE id = 25 AND name = 'bb'"),
+        )
+        self.assertEqual(
+            normalize('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            'SELECT * FROM t WHERE id IN (...)',
+        )
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_LOG_INTERVAL=0)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        slow_query_logger.last_logged.clear()
+
+    def test_template_access_is_attributed(self):
+        """Проверяем, что запрос из шаблона помечен шаблоном и строкой."""
+        # Пост без select_related: автора загрузит сам шаблон.
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs, \
+                mock.patch('posts.utils.load_post',
+                           lambda post_id: Post.objects.get(id=post_id)):
+            self.client.get(
+                reverse('posts:post_detail', args=[self.post.id])
+            )
+        events = [
+            json.loads(record.getMessage()) for record in logs.records
+        ]
+        templates = {event['template'] for event in events}
+        callers = {event['caller'] for event in events}
+        self.assertIn('posts/post_detail.html:18', templates)
+        self.assertTrue(any(
+            caller and caller.startswith('posts/utils.py')
+            for caller in callers
+        ))
+
+    def test_command_aggregates_by_shape(self):
+        """Проверяем сводку лога по форме запроса."""
+        lines = [
+            json.dumps({
+                'event': 'slow_query',
+                'sql': f'SELECT * FROM posts_post WHERE id = {post_id}',
+                'duration_ms': 150.0,
+                'template': 'posts/post_detail.html:22',
+                'suppressed': 1,
+            })
+            for post_id in (1, 2)
+        ]
+        with tempfile.NamedTemporaryFile('w', delete=False) as log:
+            log.write('\n'.join(lines))
+        self.addCleanup(os.remove, log.name)
+        out = StringIO()
+        call_command('slow_queries', log.name, stdout=out)
+        output = out.getvalue()
+        self.assertIn('600.0 мс всего, 4 раз', output)
+        self.assertIn('posts/post_detail.html:22 (4)', output)
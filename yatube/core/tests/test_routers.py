@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.routers import ReplicaRouter, replica_reads
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def test_reads_go_to_replica_only_when_enabled(self):
+        """Проверяем, что на реплику идут только разрешённые чтения."""
+        self.assertIsNone(self.router.db_for_read(Post))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            # Пользователи и сессии читаются из основной базы.
+            self.assertIsNone(self.router.db_for_read(User))
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        """Проверяем, что миграции не применяются к репликам."""
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+
+# Реплика-«зеркало»: важно лишь, какие запросы маршрутизатор отправил бы
+# на реплику.
+@override_settings(DATABASE_REPLICAS=['default'])
+@mock.patch('core.routers.random.choice', return_value='default')
+class ReplicaMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_feed_reads_from_replica(self, choice):
+        """Проверяем, что лента читается с реплики."""
+        self.client.get(reverse('posts:index'))
+        self.assertTrue(choice.called)
+
+    def test_other_views_read_from_primary(self, choice):
+        """Проверяем, что страница поста читается из основной базы."""
+        post = Post.objects.get()
+        self.client.get(reverse('posts:post_detail', args=[post.id]))
+        self.assertFalse(choice.called)
+
+    def test_write_pins_user_to_primary(self, choice):
+        """Проверяем, что после записи ленты читаются из основной базы."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('primary_pin', response.cookies)
+        response = self.client.post(
+            reverse('posts:create_post'), {'text': 'Новый пост'}
+        )
+        self.assertIn('primary_pin', response.cookies)
+        choice.reset_mock()
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        self.assertFalse(choice.called)
+
+    def test_follow_pins_user_to_primary(self, choice):
+        """Проверяем, что подписка по GET тоже закрепляет за основной базой."""
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertIn('primary_pin', response.cookies)
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.sessions import SessionStore
+
+User = get_user_model()
+
+
+class SignedCookieSessionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_requests_skip_session_table(self):
+        """Проверяем, что запрос пользователя не обращается к сессиям."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            'django_session', ' '.join(query['sql'] for query in queries)
+        )
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_unchanged_session_is_not_resent(self):
+        """Проверяем, что запись тех же значений не меняет сессию."""
+        session = SessionStore()
+        session['theme'] = 'dark'
+        self.assertTrue(session.modified)
+        session.save()
+        session = SessionStore(session.session_key)
+        session['theme'] = 'dark'
+        self.assertFalse(session.modified)
+        session['theme'] = 'light'
+        self.assertTrue(session.modified)
+
+    def test_tampered_cookie_is_dropped(self):
+        """Проверяем, что cookie с неверной подписью не принимается."""
+        session = SessionStore('forged')
+        self.assertNotIn('theme', session)
+        self.assertFalse(session.modified)
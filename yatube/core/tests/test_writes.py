@@ -0,0 +1,155 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import metrics, writes
+from core.queries import record_queries
+from posts.models import Post
+
+User = get_user_model()
+
+
+def commits():
+    counters = metrics._current()['counters']
+    return counters.get('yatube_write_commits_total', {}).get('[]', 0)
+
+
+class WriteQueueTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+
+    def create(self, text):
+        return Post.objects.create(text=text, author=self.user)
+
+    def test_writes_are_grouped(self):
+        """Проверяем, что записи, ждущие писателя, идут одной пачкой."""
+        release = threading.Event()
+        started = threading.Event()
+        batches = []
+        before = commits()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        def create(text):
+            batches.append(threading.current_thread().name)
+            return self.create(text)
+
+        with ThreadPoolExecutor(6) as executor:
+            first = executor.submit(writes.submit, block)
+            started.wait(5)
+            futures = [
+                executor.submit(writes.submit, create, f'Пост {number}')
+                for number in range(5)
+            ]
+            while writes._queue().qsize() < 5:
+                threading.Event().wait(0.01)
+            release.set()
+            first.result()
+            posts = [future.result() for future in futures]
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual({post.text for post in posts},
+                         {f'Пост {number}' for number in range(5)})
+        self.assertEqual(set(batches), {'write-queue'})
+        self.assertEqual(commits() - before, 2)
+
+    def test_failed_write_does_not_affect_batch(self):
+        """Проверяем, что ошибка одной записи достаётся только ей."""
+        def fail():
+            self.create('Откатится')
+            raise ValueError('ошибка')
+
+        with ThreadPoolExecutor(2) as executor:
+            failed = executor.submit(writes.submit, fail)
+            created = executor.submit(writes.submit, self.create, 'Пост')
+            with self.assertRaises(ValueError):
+                failed.result()
+            created.result()
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Пост']
+        )
+
+    def test_queries_are_counted_for_caller(self):
+        """Проверяем, что запросы записи видны записывающему потоку."""
+        with record_queries() as recorder:
+            writes.submit(self.create, 'Пост')
+        self.assertTrue(any(
+            sql.startswith('INSERT INTO "posts_post"')
+            for sql, _ in recorder.queries
+        ))
+
+    def test_view_writes_through_queue(self):
+        """Проверяем, что представление пишет через поток-писатель."""
+        threads = []
+
+        def saved(sender, **kwargs):
+            threads.append(threading.current_thread().name)
+
+        post_save.connect(saved, sender=Post)
+        self.addCleanup(post_save.disconnect, saved, sender=Post)
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:create_post'), {'text': 'Через очередь'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.assertTrue(Post.objects.filter(text='Через очередь').exists())
+        self.assertEqual(threads, ['write-queue'])
+
+    def test_writer_error_reaches_caller(self):
+        """Проверяем, что ошибка вне записи не вешает вызывающего."""
+        with mock.patch.object(writes, '_commit',
+                               side_effect=RuntimeError('сбой')), \
+                self.assertLogs('core.writes', 'ERROR'):
+            with self.assertRaises(RuntimeError):
+                writes.submit(self.create, 'Пост')
+        self.assertEqual(writes.submit(self.create, 'Пост').text, 'Пост')
+
+    @override_settings(WRITE_QUEUE_TIMEOUT=0.5)
+    def test_dead_writer_is_restarted(self):
+        """Проверяем таймаут при упавшем писателе и его перезапуск."""
+        with mock.patch.object(writes, '_commit', side_effect=SystemExit):
+            with self.assertRaises(writes.WriteQueueTimeout):
+                writes.submit(self.create, 'Потеряется')
+        self.assertFalse(writes._state['thread'].is_alive())
+        with self.assertLogs('core.writes', 'ERROR'):
+            self.assertEqual(writes.submit(self.create, 'Пост').text, 'Пост')
+        self.assertTrue(writes._state['thread'].is_alive())
+
+    @override_settings(WRITE_QUEUE_TIMEOUT=0.1)
+    def test_timeout_answers_503(self):
+        """Проверяем ответ 503, если писатель не успел."""
+        release = threading.Event()
+        started = threading.Event()
+        self.addCleanup(release.set)
+        self.client.force_login(self.user)
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(writes.submit, block)
+            started.wait(5)
+            response = self.client.post(
+                reverse('posts:create_post'), {'text': 'Не успеет'}
+            )
+            release.set()
+        self.assertEqual(response.status_code,
+                         HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertFalse(Post.objects.filter(text='Не успеет').exists())
+
+
+class InlineWriteTest(TestCase):
+    def test_inside_transaction_runs_inline(self):
+        """Проверяем, что внутри транзакции запись идёт в том же потоке."""
+        self.assertIs(
+            writes.submit(threading.current_thread),
+            threading.current_thread(),
+        )
@@ -0,0 +1,33 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_phases = ContextVar('timing_phases', default=None)
+
+
+def start():
+    """Начинает сбор фаз для текущего запроса."""
+    phases = {}
+    return phases, _phases.set(phases)
+
+
+def stop(token):
+    _phases.reset(token)
+
+
+def record(phase, duration):
+    """Добавляет длительность к фазе, вне запроса ничего не делает."""
+    phases = _phases.get()
+    if phases is None:
+        return
+    total, count = phases.get(phase, (0.0, 0))
+    phases[phase] = (total + duration, count + 1)
+
+
+@contextmanager
+def measure(phase):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start_time)
@@ -1,6 +1,14 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
 from django.shortcuts import render
+from django.views.decorators.cache import never_cache
+
+from core import memory, metrics
 
 
 def page_not_found(request, exception):
@@ -20,3 +28,27 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@never_cache
+def csrf_token(request):
+    """Токен CSRF для форм, которые отрисованы без него."""
+    return JsonResponse({'token': get_token(request)})
+
+
+def metrics_view(request):
+    """Метрики для персонала и для адресов из METRICS_ALLOWED_IPS."""
+    if (request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS
+            and not request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@staff_member_required
+def memory_report(request):
+    return render(request, 'core/memory.html', {
+        'report': memory.report(),
+    })
@@ -0,0 +1,126 @@
+"""
+Очередь записей: все записи процесса выполняет один поток-писатель.
+
+Писатель забирает из очереди всё, что накопилось, пока шла прошлая
+пачка, и выполняет в одной транзакции: одна фиксация на диск на пачку
+вместо одной на запрос, и писатели не толкаются за блокировку SQLite.
+Каждая запись идёт в своей точке сохранения, так что ошибка одной не
+откатывает соседние. Вызывающий получает результат или исключение
+своей записи, как при обычном вызове, а запросы записи добавляются
+к запросам его потока (бюджеты, метрики, Server-Timing).
+
+Дольше WRITE_QUEUE_TIMEOUT вызывающий не ждёт: ещё не начатая запись
+отменяется, и submit бросает WriteQueueTimeout, на который
+WriteQueueMiddleware отвечает 503. Упавший поток-писатель
+перезапускается при следующем вызове.
+"""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from core import metrics
+from core.queries import record_queries, replay
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {'pid': None, 'thread': None}
+
+
+class WriteQueueTimeout(Exception):
+    pass
+
+
+def submit(func, *args, **kwargs):
+    """Выполняет func в потоке-писателе и возвращает её результат."""
+    # Внутри транзакции вызывающего писатель не увидит её данных,
+    # а из самого писателя ждать себя же нельзя.
+    if (not settings.WRITE_QUEUE_ENABLED
+            or connection.in_atomic_block
+            or threading.current_thread() is _state['thread']):
+        return func(*args, **kwargs)
+    future = Future()
+    _queue().put((future, func, args, kwargs))
+    try:
+        result, queries = future.result(settings.WRITE_QUEUE_TIMEOUT)
+    except TimeoutError:
+        metrics.inc('yatube_write_timeouts_total')
+        raise WriteQueueTimeout(
+            'запись не выполнена' if future.cancel()
+            else 'запись ещё выполняется'
+        )
+    replay(queries)
+    return result
+
+
+def _queue():
+    with _lock:
+        # После fork поток-писатель родителя не существует.
+        if _state['pid'] != os.getpid():
+            _state.update(pid=os.getpid(), queue=queue.Queue(), thread=None)
+        thread = _state['thread']
+        if thread is None or not thread.is_alive():
+            if thread is not None:
+                logger.error('Поток-писатель остановился, перезапускаем')
+            _state['thread'] = threading.Thread(
+                target=_work, args=(_state['queue'],),
+                name='write-queue', daemon=True,
+            )
+            _state['thread'].start()
+        return _state['queue']
+
+
+def _work(tasks):
+    while True:
+        batch = [tasks.get()]
+        while len(batch) < settings.WRITE_QUEUE_BATCH:
+            try:
+                batch.append(tasks.get_nowait())
+            except queue.Empty:
+                break
+        # Отменённые по таймауту записи не выполняются.
+        batch = [
+            task for task in batch if task[0].set_running_or_notify_cancel()
+        ]
+        if not batch:
+            continue
+        try:
+            _commit(batch)
+        except Exception as exc:
+            logger.exception('Ошибка потока-писателя')
+            connection.close()
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+
+
+def _commit(batch):
+    results = []
+    try:
+        with transaction.atomic():
+            for future, func, args, kwargs in batch:
+                try:
+                    with transaction.atomic(), \
+                            record_queries() as recorder:
+                        result = func(*args, **kwargs)
+                    results.append((future, (result, recorder.queries), None))
+                except Exception as exc:
+                    results.append((future, None, exc))
+    except Exception as exc:
+        # Не зафиксировалась вся пачка: сообщаем об ошибке всем.
+        connection.close()
+        for future, *_ in batch:
+            future.set_exception(exc)
+        return
+    metrics.inc('yatube_write_commits_total')
+    metrics.inc('yatube_writes_total', len(batch))
+    for future, result, exc in results:
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
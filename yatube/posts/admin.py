@@ -1,33 +1,195 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import CASCADE, Q
 
-from .models import Post, Group, Comment, Follow
+from core.counting import CachedCountPaginator
+from . import deletion, moderation
+from .converters import parse_id
+from .models import (
+    Post, Group, Comment, Follow, ArchivedPost, ArchivedComment, DeletionJob
+)
 
+User = get_user_model()
 
-class PostAdmin(admin.ModelAdmin):
+
+class IndexedSearchMixin:
+    """
+    Поиск, который не читает всю таблицу: поля search_fields с '^'
+    ищутся диапазоном field >= q AND field < q + '\U0010ffff' по индексу
+    (с учётом регистра), поля с '=' — точным совпадением с числом,
+    а остальные — icontains только среди search_scan_rows последних
+    строк. Этот поиск используют и виджеты autocomplete_fields.
+    """
+    search_scan_rows = 10000
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for field in self.search_fields:
+            if field[0] not in '^=':
+                query |= self.recent(Q(**{f'{field}__icontains': term}))
+            elif field.startswith('^'):
+                field = field[1:]
+                query |= Q(**{
+                    f'{field}__gte': term,
+                    f'{field}__lt': term + '\U0010ffff',
+                })
+            elif field.startswith('=') and parse_id(term) is not None:
+                query |= Q(**{field[1:]: parse_id(term)})
+        if not query:
+            return queryset.none(), False
+        return queryset.filter(query), False
+
+    def recent(self, query):
+        bound = self.model._default_manager.order_by('-pk').values_list(
+            'pk', flat=True
+        )[self.search_scan_rows - 1:self.search_scan_rows]
+        if bound:
+            query &= Q(pk__gte=bound[0])
+        return query
+
+
+class CachedCountMixin:
+    """Число строк списка из кеша, без полного COUNT(*) таблицы."""
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+
+class BackgroundDeleteMixin:
+    """
+    Удаление через DeletionJob: объект сразу скрывается, а связанные
+    строки удаляет команда process_deletions. Страница подтверждения
+    не собирает все связанные объекты, как делает коллектор Django.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        to_delete = [
+            f'{obj} — будет скрыт сразу и удалён в фоне' for obj in objs
+        ]
+        return to_delete, {}, self.get_perms_needed(request), []
+
+    def get_perms_needed(self, request):
+        """
+        Как и коллектор Django, требует права на удаление всех моделей,
+        строки которых удалятся каскадом. Проверяются модели, а не
+        строки: так не нужно их загружать.
+        """
+        perms_needed = set()
+        models, seen = [self.model], {self.model}
+        while models:
+            for relation in models.pop()._meta.related_objects:
+                related = relation.related_model
+                if (relation.many_to_many
+                        or relation.on_delete is not CASCADE
+                        or related in seen):
+                    continue
+                seen.add(related)
+                models.append(related)
+                model_admin = self.admin_site._registry.get(related)
+                if (model_admin is not None
+                        and not model_admin.has_delete_permission(request)):
+                    perms_needed.add(related._meta.verbose_name)
+        return perms_needed
+
+    def delete_model(self, request, obj):
+        deletion.schedule(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            deletion.schedule(obj)
+        messages.info(
+            request, 'Удаление поставлено в очередь process_deletions.'
+        )
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
+
+
+class BulkActionsMixin:
+    """
+    Действия модерации, которые выполняются пачками запросов
+    UPDATE/DELETE через posts.moderation, без загрузки объектов.
+    """
+    bulk_delete = None
+    bulk_delete_by_authors = None
+
+    def delete_by_authors(self, request, queryset):
+        deleted = self.bulk_delete_by_authors(queryset)
+        messages.success(request, f'Удалено строк: {deleted}.')
+    delete_by_authors.short_description = (
+        'Удалить всё, что написали авторы выбранных'
+    )
+
+    def delete_matching_search(self, request, queryset):
+        changelist = self.get_changelist_instance(request)
+        if not changelist.query and not changelist.get_filters_params():
+            messages.error(request, 'Сначала задайте поиск или фильтр.')
+            return
+        deleted = self.bulk_delete(changelist.get_queryset(request))
+        messages.success(request, f'Удалено строк: {deleted}.')
+    delete_matching_search.short_description = (
+        'Удалить всё, что найдено поиском и фильтрами'
+    )
+
+
+class PostAdmin(CachedCountMixin, IndexedSearchMixin, BulkActionsMixin,
+                BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = ('pk',
                     'text',
                     'pub_date',
                     'author',
                     'group',
                     )
-    search_fields = ('text',)
+    search_fields = ('=id', '^author__username', 'text')
     list_filter = ('pub_date',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_by_authors', 'delete_matching_search')
+    bulk_delete = staticmethod(moderation.delete_posts)
+    bulk_delete_by_authors = staticmethod(moderation.delete_posts_by_authors)
+
+    def move_to_group(self, request, queryset):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if not form.is_valid() or form.cleaned_data['group'] is None:
+            messages.error(request, 'Выберите группу.')
+            return
+        moved = moderation.move_to_group(queryset, form.cleaned_data['group'])
+        messages.success(request, f'Перенесено постов: {moved}.')
+    move_to_group.short_description = 'Перенести в группу'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(IndexedSearchMixin, BackgroundDeleteMixin,
+                 admin.ModelAdmin):
     list_display = ('pk',
                     'title',
                     'slug',
                     'description',
                     )
-    search_fields = ('title',)
-    list_filter = ('title',)
+    search_fields = ('=id', '^title', '^slug')
+    ordering = ('title',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(CachedCountMixin, IndexedSearchMixin, BulkActionsMixin,
+                   admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -35,18 +197,88 @@ class CommentAdmin(admin.ModelAdmin):
         'post',
         'author',
     )
-    search_fields = ('author__username', 'text',)
+    search_fields = ('=id', '^author__username', 'text')
     list_filter = ('created',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    raw_id_fields = ('parent',)
     empty_value_display = '-пусто-'
+    actions = ('delete_by_authors', 'delete_matching_search')
+    bulk_delete = staticmethod(moderation.delete_comments)
+    bulk_delete_by_authors = staticmethod(
+        moderation.delete_comments_by_authors
+    )
 
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Путь комментария строится при вставке из поста и родителя:
+        после их смены он указывал бы в чужую ветку или пост.
+        """
+        fields = super().get_readonly_fields(request, obj)
+        if obj is not None:
+            fields = (*fields, 'post', 'parent')
+        return fields
 
-class FollowAdmin(admin.ModelAdmin):
+
+class FollowAdmin(CachedCountMixin, IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'user',
         'author',
     )
-    search_fields = ('author__username',)
+    search_fields = ('^author__username', '^user__username')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    empty_value_display = '-пусто-'
+
+
+class ArchivedPostAdmin(CachedCountMixin, IndexedSearchMixin,
+                        admin.ModelAdmin):
+    list_display = ('pk',
+                    'text',
+                    'pub_date',
+                    'author',
+                    'group',
+                    'archived',
+                    )
+    search_fields = ('=id', '^author__username')
+    list_filter = ('pub_date',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+    empty_value_display = '-пусто-'
+
+
+class ArchivedCommentAdmin(CachedCountMixin, IndexedSearchMixin,
+                           admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'post',
+        'author',
+    )
+    search_fields = ('=id', '^author__username')
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    empty_value_display = '-пусто-'
+
+
+class UserAdmin(CachedCountMixin, IndexedSearchMixin, BackgroundDeleteMixin,
+                BaseUserAdmin):
+    search_fields = ('=id', '^username')
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'model',
+        'object_repr',
+        'created',
+        'finished',
+        'processed',
+        'error',
+    )
+    list_filter = ('model', 'finished')
     empty_value_display = '-пусто-'
 
 
@@ -54,3 +286,8 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(ArchivedPost, ArchivedPostAdmin)
+admin.site.register(ArchivedComment, ArchivedCommentAdmin)
+admin.site.register(DeletionJob, DeletionJobAdmin)
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,117 @@
+"""
+Валидаторы для условных GET-запросов (ETag и Last-Modified).
+
+Они считаются без отрисовки страницы: посты текущей страницы (id,
+дата публикации и дата правки), число и дата последнего комментария.
+Страницу постов и подписку валидаторы берут через utils.shared, так
+что при ответе 200 представление не читает их повторно. Если ничего
+не изменилось, декоратор condition отвечает 304 Not Modified.
+
+ETag учитывает всё, что видно на странице, включая пользователя,
+а также имя автора и название группы: их берут из тех же кешированных
+объектов, что и страница, так что после переименования ETag меняется
+вместе с ней.
+Last-Modified берётся по датам публикации и правки, удаления он не
+замечает; клиенты, присылающие If-None-Match, проверяются по ETag.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from core.objects import get_cached_or_404
+from .deletion import exclude_hidden_comments, is_hidden
+from .models import Group, User
+from .utils import (
+    author_post_count, get_post_or_404, group_page, is_following,
+    profile_page,
+)
+
+
+def page_rows(page):
+    """id и даты постов страницы, которую затем покажет представление."""
+    return [(post.id, post.pub_date, post.edited) for post in page]
+
+
+def author_names(author):
+    return author.username, author.get_full_name()
+
+
+def latest(*moments):
+    moments = [moment for moment in moments if moment is not None]
+    return max(moments) if moments else None
+
+
+def rows_modified(rows):
+    return latest(*(moment for _, *dates in rows for moment in dates))
+
+
+def validators(func):
+    """
+    Считает (etag, last_modified) один раз на запрос: condition
+    вызывает обе функции по отдельности.
+    """
+    def compute(request, **kwargs):
+        if not hasattr(request, '_validators'):
+            parts, last_modified = func(request, **kwargs)
+            digest = None
+            if parts is not None:
+                user = request.user.pk if request.user.is_authenticated else 0
+                digest = hashlib.md5(repr(
+                    (settings.PAGE_ETAG_VERSION, user, parts)
+                ).encode()).hexdigest()
+            request._validators = digest, last_modified
+        return request._validators
+
+    def etag(request, **kwargs):
+        return compute(request, **kwargs)[0]
+
+    def last_modified(request, **kwargs):
+        return compute(request, **kwargs)[1]
+
+    return etag, last_modified
+
+
+def _post_detail(request, post_id):
+    post = get_post_or_404(post_id)
+    comments = exclude_hidden_comments(post.comments.all()).aggregate(
+        total=Count('id'), last=Max('created')
+    )
+    parts = (
+        post.id, post.is_archived, post.edited,
+        author_names(post.author),
+        post.group.title if post.group else None,
+        comments['total'], comments['last'],
+        # На странице выводится число постов автора.
+        author_post_count(post.author_id),
+    )
+    return parts, latest(post.pub_date, post.edited, comments['last'])
+
+
+def _group_posts(request, slug):
+    group = get_cached_or_404(Group, slug=slug)
+    if is_hidden('group', group.pk):
+        # Страницы нет: представление ответит 404.
+        return None, None
+    page = group_page(request, group)
+    rows = page_rows(page)
+    parts = (group.title, group.description, page.paginator.count, rows)
+    return parts, rows_modified(rows)
+
+
+def _profile(request, username):
+    author = get_cached_or_404(User, username=username)
+    if is_hidden('user', author.pk):
+        return None, None
+    page = profile_page(request, author)
+    rows = page_rows(page)
+    parts = (
+        author.pk, author_names(author), is_following(request, author),
+        page.paginator.count, rows,
+    )
+    return parts, rows_modified(rows)
+
+
+post_detail_etag, post_detail_last_modified = validators(_post_detail)
+group_posts_etag, group_posts_last_modified = validators(_group_posts)
+profile_etag, profile_last_modified = validators(_profile)
@@ -0,0 +1,36 @@
+import re
+
+
+class IdConverter:
+    """
+    id записи: как int, но не длиннее 18 цифр. Большие числа SQLite
+    не принимает, и вместо 404 запрос упал бы с ошибкой.
+    """
+    regex = r'[0-9]{1,18}'
+
+    def to_python(self, value):
+        return int(value)
+
+    def to_url(self, value):
+        return str(value)
+
+
+def parse_id(value):
+    """id из строки запроса по правилам IdConverter, иначе None."""
+    if value is not None and re.fullmatch(IdConverter.regex, str(value)):
+        return int(value)
+    return None
+
+
+class UsernameConverter:
+    """
+    Имя пользователя в адресе: те же символы и длина, что разрешает
+    валидатор username, так что мусор отсекается без запроса к базе.
+    """
+    regex = r'[\w.@+-]{1,150}'
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
@@ -0,0 +1,288 @@
+"""
+Отложенное удаление пользователей, постов и групп.
+
+Коллектор Django перед удалением загружает в память все зависимые
+строки и удаляет их одной транзакцией, держа блокировку SQLite всё
+это время. Здесь объект сразу скрывается, а зависимые строки
+удаляются или обнуляются пачками по DELETION_CHUNK_SIZE, каждая
+в своей короткой транзакции. Шаги идемпотентны: прерванное задание
+просто продолжается со следующего запуска.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import counting, objects
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, DeletionJob, Follow, Group, Post,
+    check_path,
+)
+
+User = get_user_model()
+
+MODELS = {'user': User, 'post': Post, 'group': Group}
+
+HIDDEN_CACHE_KEY = 'deletion:hidden'
+
+# Сколько веток удалять за шаг: условия веток объединяются через OR,
+# а SQLite ограничивает глубину выражения тысячей узлов.
+SUBTREE_ROOTS = 100
+
+
+def schedule(obj):
+    """Скрывает объект и ставит его удаление в очередь."""
+    model = next(name for name, cls in MODELS.items() if isinstance(obj, cls))
+    with transaction.atomic():
+        if model == 'user':
+            # Не даём войти, пока удаляются данные.
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+        job, _ = DeletionJob.objects.get_or_create(
+            model=model,
+            object_id=obj.pk,
+            finished__isnull=True,
+            defaults={'object_repr': str(obj)[:200]},
+        )
+    cache.delete(HIDDEN_CACHE_KEY)
+    return job
+
+
+def hidden():
+    """
+    id объектов, ждущих удаления, по моделям. Читается из кеша,
+    поэтому в других процессах объект пропадает не позже чем через
+    DELETION_HIDDEN_CACHE_SECONDS.
+    """
+    result = cache.get(HIDDEN_CACHE_KEY)
+    if result is None:
+        result = {name: set() for name in MODELS}
+        pending = DeletionJob.objects.filter(finished__isnull=True)
+        for model, object_id in pending.values_list('model', 'object_id'):
+            result[model].add(object_id)
+        cache.set(
+            HIDDEN_CACHE_KEY, result, settings.DELETION_HIDDEN_CACHE_SECONDS
+        )
+    return result
+
+
+def exclude_hidden(posts):
+    """Убирает из выборки постов удаляемые посты и посты удаляемых авторов."""
+    ids = hidden()
+    if ids['post']:
+        posts = posts.exclude(id__in=ids['post'])
+    if ids['user']:
+        posts = posts.exclude(author_id__in=ids['user'])
+    return posts
+
+
+def exclude_hidden_comments(comments):
+    """Убирает из выборки комментарии удаляемых авторов."""
+    users = hidden()['user']
+    return comments.exclude(author_id__in=users) if users else comments
+
+
+def visible_count_key(key):
+    """
+    Именованный счётчик (count_key) считает и скрытые посты: пока они
+    есть, число берётся по самой выборке с exclude_hidden.
+    """
+    ids = hidden()
+    return None if ids['post'] or ids['user'] else key
+
+
+def is_hidden(model, object_id):
+    return int(object_id) in hidden()[model]
+
+
+def forget_posts(model, ids):
+    """Сигналы пачками не отправляются: сбрасываем кеш постов сами."""
+    if model in (Post, ArchivedPost):
+        objects.forget(Post, 'id', ids)
+
+
+def delete_chunk(queryset, size):
+    """
+    Удаляет первые size строк выборки без коллектора. Порядок выборки
+    должен ставить зависимые строки раньше тех, на кого они ссылаются.
+    """
+    ids = list(queryset.values_list('id', flat=True)[:size])
+    if ids:
+        delete_ids(queryset.model, ids)
+        forget_posts(queryset.model, ids)
+    return len(ids)
+
+
+def delete_ids(model, ids):
+    """
+    DELETE строк model с id из ids одним запросом: без коллектора,
+    сигналов и каскада. Ссылающиеся строки удаляются раньше.
+    """
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {column} IN ({placeholders})', ids
+        )
+
+
+def update_chunk(queryset, size, **values):
+    ids = list(queryset.values_list('id', flat=True)[:size])
+    if ids:
+        queryset.model.objects.filter(id__in=ids).update(**values)
+        forget_posts(queryset.model, ids)
+    return len(ids)
+
+
+def delete_subtrees(comments, size):
+    """
+    Удаляет ветки первых комментариев выборки вместе с ответами
+    других пользователей. Ответ длиннее и больше пути родителя,
+    поэтому по убыванию пути ответы уходят раньше родителей.
+    """
+    roots = comments.order_by('id').values_list('post_id', 'path')
+    roots = roots[:min(size, SUBTREE_ROOTS)]
+    branches = Q()
+    for post_id, path in roots:
+        check_path(path)
+        branches |= Q(
+            post_id=post_id,
+            path__gte=path,
+            path__lt=path + Comment.PATH_END,
+        )
+    if not branches:
+        return 0
+    return delete_chunk(
+        comments.model.objects.filter(branches).order_by('-path'), size
+    )
+
+
+def delete_posts(posts, comment_model, size):
+    """Удаляет комментарии пачки постов, а когда их не осталось — посты."""
+    ids = list(posts.order_by('id').values_list('id', flat=True)[:size])
+    if not ids:
+        return 0
+    comments = comment_model.objects.filter(post_id__in=ids)
+    return (
+        delete_chunk(comments.order_by('-post_id', '-path'), size)
+        or delete_chunk(posts.model.objects.filter(id__in=ids), size)
+    )
+
+
+def drain(step, size=None, pause=None):
+    """
+    Повторяет шаг, каждый раз в своей транзакции, пока он не вернёт 0.
+    Возвращает общее число обработанных строк.
+    """
+    size = size or settings.DELETION_CHUNK_SIZE
+    pause = settings.DELETION_PAUSE if pause is None else pause
+    total = 0
+    while True:
+        with transaction.atomic():
+            done = step(size)
+        if not done:
+            return total
+        total += done
+        time.sleep(pause)
+
+
+def plan(job):
+    """Шаги задания: каждый обрабатывает пачку и возвращает её размер."""
+    pk = job.object_id
+    if job.model == 'user':
+        return [
+            lambda size: delete_subtrees(
+                Comment.objects.filter(author_id=pk), size
+            ),
+            lambda size: delete_subtrees(
+                ArchivedComment.objects.filter(author_id=pk), size
+            ),
+            lambda size: delete_posts(
+                Post.objects.filter(author_id=pk), Comment, size
+            ),
+            lambda size: delete_posts(
+                ArchivedPost.objects.filter(author_id=pk),
+                ArchivedComment, size
+            ),
+            lambda size: delete_chunk(
+                Follow.objects.filter(user_id=pk), size
+            ),
+            lambda size: delete_chunk(
+                Follow.objects.filter(author_id=pk), size
+            ),
+        ]
+    if job.model == 'post':
+        return [
+            lambda size: delete_chunk(
+                Comment.objects.filter(post_id=pk).order_by('-path'), size
+            ),
+            lambda size: delete_chunk(
+                ArchivedComment.objects.filter(post_id=pk).order_by('-path'),
+                size
+            ),
+            lambda size: delete_chunk(
+                ArchivedPost.objects.filter(id=pk), size
+            ),
+        ]
+    return [
+        lambda size: update_chunk(
+            Post.objects.filter(group_id=pk), size,
+            group=None, edited=timezone.now()
+        ),
+        lambda size: update_chunk(
+            ArchivedPost.objects.filter(group_id=pk), size,
+            group=None, edited=timezone.now()
+        ),
+    ]
+
+
+def run(job, size=None, pause=None, progress=None):
+    """
+    Выполняет задание до конца. Остаток связей, которых к этому
+    моменту немного, удаляет обычный delete() в последней транзакции.
+    """
+    size = size or settings.DELETION_CHUNK_SIZE
+    pause = settings.DELETION_PAUSE if pause is None else pause
+    for step in plan(job):
+        while True:
+            with transaction.atomic():
+                done = step(size)
+                if done:
+                    job.processed += done
+                    job.save(update_fields=['processed'])
+            if not done:
+                break
+            if progress:
+                progress(job)
+            # Даём другим писателям взять блокировку между пачками.
+            time.sleep(pause)
+    with transaction.atomic():
+        MODELS[job.model].objects.filter(pk=job.object_id).delete()
+        job.finished = timezone.now()
+        job.error = ''
+        job.save(update_fields=['finished', 'error'])
+    cache.delete(HIDDEN_CACHE_KEY)
+    forget_counts(job)
+
+
+def forget_counts(job):
+    """
+    Пачки удалялись без сигналов, так что счётчики постов и комментариев
+    сбрасываются после задания. Группы удалённых постов пользователя
+    к этому моменту неизвестны, поэтому сбрасываются счётчики всех
+    групп: их немного.
+    """
+    if job.model == 'user':
+        counting.invalidate(
+            Post,
+            author_id=[job.object_id],
+            group_id=Group.objects.values_list('id', flat=True),
+        )
+    elif job.model == 'group':
+        counting.invalidate(Post, group_id=[job.object_id])
+    counting.invalidate(Comment)
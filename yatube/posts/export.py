@@ -0,0 +1,102 @@
+"""
+Потоковая выгрузка таблиц в CSV или JSONL.
+
+Строки читаются keyset-пачками по id (id > последнего выгруженного),
+каждая пачка — отдельный короткий запрос, поэтому память не зависит
+от размера таблицы, а выгрузку можно продолжить с любого id.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArchivedComment, ArchivedPost, Comment, Follow, Post
+
+TABLES = {
+    'posts': (
+        Post,
+        ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image'),
+    ),
+    'comments': (
+        Comment,
+        ('id', 'text', 'created', 'post_id', 'author_id', 'parent_id',
+         'path'),
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+    'archived_posts': (
+        ArchivedPost,
+        ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+         'archived'),
+    ),
+    'archived_comments': (
+        ArchivedComment,
+        ('id', 'text', 'created', 'post_id', 'author_id', 'parent_id',
+         'path'),
+    ),
+}
+
+FORMATS = ('csv', 'jsonl')
+
+
+def chunks(table, after=0, size=None):
+    """Пачки строк таблицы (кортежи значений) по возрастанию id."""
+    model, fields = TABLES[table]
+    size = size or settings.EXPORT_CHUNK_SIZE
+    rows = model.objects.order_by('id').values_list(*fields)
+    while True:
+        chunk = list(rows.filter(id__gt=after)[:size])
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1][0]
+
+
+def encode_csv(fields, chunk, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    writer.writerows(chunk)
+    return buffer.getvalue().encode()
+
+
+def encode_jsonl(fields, chunk, header=False):
+    return ''.join(
+        json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder,
+                   ensure_ascii=False) + '\n'
+        for row in chunk
+    ).encode()
+
+
+ENCODERS = {'csv': encode_csv, 'jsonl': encode_jsonl}
+
+
+def export(table, fmt='csv', after=0, compress=False, progress=None):
+    """
+    Байтовые куски выгрузки, по одному на пачку. Заголовок CSV пишется
+    только при выгрузке с начала, чтобы продолженную выгрузку можно было
+    дописать в файл. progress(id) вызывается после того, как кусок пачки
+    забран, с последним id пачки.
+
+    При сжатии каждая пачка — отдельный полный член gzip (склейка
+    членов — корректный gzip-файл). Так к моменту progress все строки
+    пачки уже отданы, а не лежат в буфере компрессора, и выгрузка,
+    прерванная между пачками и продолженная с последнего id, читается
+    целиком.
+    """
+    encode = ENCODERS[fmt]
+    fields = TABLES[table][1]
+    header = not after
+    for chunk in chunks(table, after):
+        data = encode(fields, chunk, header)
+        header = False
+        if compress:
+            # wbits=31: поток в формате gzip, а не zlib.
+            compressor = zlib.compressobj(wbits=31)
+            data = compressor.compress(data) + compressor.flush()
+        yield data
+        if progress:
+            progress(chunk[-1][0])
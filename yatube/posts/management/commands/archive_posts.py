@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import objects
+from posts import deletion
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author_id', 'group_id', 'image', 'edited'
+)
+
+COMMENT_FIELDS = (
+    'id', 'text', 'created', 'post_id', 'author_id', 'parent_id', 'path'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше порога вместе с комментариями в архивные '
+        'таблицы. Каждая пачка переносится в своей транзакции, так что '
+        'команду можно прервать и запустить снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше стольких дней.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old = Post.objects.filter(pub_date__lt=cutoff).order_by('pub_date')
+        posts = comments = 0
+        started = time.monotonic()
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    old.values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                comments += self.move(
+                    Comment.objects.filter(post_id__in=ids),
+                    ArchivedComment, COMMENT_FIELDS, options['batch_size'],
+                )
+                posts += self.move(
+                    Post.objects.filter(id__in=ids),
+                    ArchivedPost, POST_FIELDS, options['batch_size'],
+                )
+                objects.forget(Post, 'id', ids)
+            self.stdout.write(f'Перенесено постов: {posts}')
+        self.stdout.write(
+            f'Готово: {posts} постов и {comments} комментариев '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+
+    @staticmethod
+    def move(queryset, archive, fields, size):
+        """
+        Копирует строки в архив и удаляет их без загрузки объектов,
+        пачками по size строк по возрастанию id, чтобы в памяти не
+        оказались сразу все комментарии пачки постов.
+        """
+        moved = 0
+        after = 0
+        while True:
+            rows = list(
+                queryset.filter(id__gt=after).order_by('id').values(*fields)
+                [:size]
+            )
+            if not rows:
+                return moved
+            archive.objects.bulk_create(archive(**row) for row in rows)
+            ids = [row['id'] for row in rows]
+            # Комментарии пачки удаляются раньше постов, других ссылок
+            # на эти строки нет, поэтому каскад Django здесь не нужен.
+            deletion.delete_ids(queryset.model, ids)
+            moved += len(rows)
+            after = ids[-1]
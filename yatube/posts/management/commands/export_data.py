@@ -0,0 +1,58 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.routers import replica_reads
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает таблицу в CSV или JSONL, при необходимости '
+        'со сжатием gzip. Память не зависит от размера таблицы; '
+        'прерванную выгрузку продолжает --after с последним id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(export.TABLES))
+        parser.add_argument('--format', choices=export.FORMATS,
+                            default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='Выгрузить строки с id больше этого.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки; при --after дописывается в конец. '
+                 'По умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        mode = 'ab' if options['after'] else 'wb'
+        if options['output']:
+            file = open(options['output'], mode)
+        else:
+            file = sys.stdout.buffer
+        self.last_id = options['after']
+        started = time.monotonic()
+        try:
+            # Выгрузка только читает: если есть реплики, нагрузка на них.
+            with replica_reads():
+                for data in export.export(
+                    options['table'], options['format'], options['after'],
+                    options['gzip'], self.progress,
+                ):
+                    file.write(data)
+                    file.flush()
+        finally:
+            if options['output']:
+                file.close()
+            self.stderr.write(
+                f'Последний выгруженный id: {self.last_id} '
+                f'({time.monotonic() - started:.1f} с)'
+            )
+
+    def progress(self, last_id):
+        self.last_id = last_id
@@ -0,0 +1,261 @@
+import io
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import keep_timestamps, next_free_id
+
+User = get_user_model()
+
+WORDS = (
+    'утро вечер город море лес дорога книга письмо окно дом сад ветер '
+    'дождь снег солнце река мост поезд друг песня голос память время '
+    'свет тень кофе чай кот пёс история новость идея мечта работа отдых '
+    'тихий яркий старый новый долгий быстрый тёплый холодный добрый'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетический набор данных: пользователей, группы, '
+        'посты, комментарии и подписки со степенным распределением '
+        'популярности. Одинаковый --seed даёт одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя.'
+        )
+        parser.add_argument('--reply-ratio', type=float, default=0.3)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного распределения популярности.'
+        )
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок сгенерировать для постов.'
+        )
+        parser.add_argument('--image-ratio', type=float, default=0.1)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--until', type=datetime.fromisoformat, default=None,
+            help='Дата последнего поста, по умолчанию начало текущих суток.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.alpha = options['alpha']
+        until = options['until'] or timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if timezone.is_naive(until):
+            until = timezone.make_aware(until)
+        self.end = until.timestamp()
+        self.start = self.end - timedelta(days=options['days']).total_seconds()
+
+        user_ids = self.insert(User, self.users(options['users']))
+        group_ids = self.insert(Group, self.groups(options['groups']))
+        images = self.images(options['images'], options['seed'])
+        with keep_timestamps(Post, Comment):
+            self.post_times = array('d')
+            post_ids = self.insert(Post, self.posts(
+                options['posts'], user_ids, group_ids,
+                images, options['image_ratio'],
+            ))
+            self.insert(Comment, self.comments(
+                options['comments'], user_ids, post_ids,
+                options['reply_ratio'],
+            ))
+        self.insert(Follow, self.follows(user_ids, options['follows']))
+
+    def insert(self, model, objects):
+        """Вставляет объекты пачками, каждая в своей транзакции."""
+        name = model._meta.model_name
+        first_id = self.next_id(model)
+        count = 0
+        started = time.monotonic()
+        batch = []
+        for obj in objects:
+            if obj.id is None:
+                obj.id = first_id + count
+            batch.append(obj)
+            count += 1
+            if len(batch) == self.batch_size:
+                self.flush(model, batch)
+                batch = []
+        self.flush(model, batch)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f'{name}: {count} за {elapsed:.1f} с '
+            f'({count / elapsed:.0f} строк/с)'
+        )
+        return range(first_id, first_id + count)
+
+    @staticmethod
+    def flush(model, batch):
+        if batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+
+    @staticmethod
+    def next_id(model):
+        return next_free_id(model)
+
+    def popularity(self, ids):
+        """
+        Накопленные веса Ципфа: i-й по популярности объект выбирается
+        с весом 1 / i ** alpha. Порядок популярности перемешан.
+        """
+        ranked = list(ids)
+        self.rng.shuffle(ranked)
+        weights = accumulate(
+            1 / (rank + 1) ** self.alpha for rank in range(len(ranked))
+        )
+        return ranked, list(weights)
+
+    def pick(self, population, k):
+        ranked, weights = population
+        return self.rng.choices(ranked, cum_weights=weights, k=k)
+
+    def text(self, low, high):
+        return ' '.join(
+            self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        ).capitalize()
+
+    def users(self, count):
+        # Один хеш на всех: вычислять его для каждого слишком дорого.
+        password = make_password(None)
+        joined = timezone.now()
+        next_id = self.next_id(User)
+        for number in range(next_id, next_id + count):
+            yield User(
+                username=f'user{number}',
+                password=password,
+                date_joined=joined,
+            )
+
+    def groups(self, count):
+        next_id = self.next_id(Group)
+        for number in range(next_id, next_id + count):
+            yield Group(
+                title=self.text(1, 3),
+                slug=f'group-{number}',
+                description=self.text(5, 20),
+            )
+
+    def images(self, count, seed):
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', (960, 339), self.color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(5):
+                x, y = self.rng.randrange(960), self.rng.randrange(339)
+                size = self.rng.randrange(20, 200)
+                draw.ellipse((x, y, x + size, y + size), fill=self.color())
+            content = io.BytesIO()
+            image.save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/generated/{seed}_{number}.jpg',
+                ContentFile(content.getvalue())
+            ))
+        return names
+
+    def color(self):
+        return tuple(self.rng.randrange(256) for _ in range(3))
+
+    def posts(self, count, user_ids, group_ids, images, image_ratio):
+        authors = self.popularity(user_ids)
+        groups = self.popularity(group_ids) if group_ids else None
+        span = self.end - self.start
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            for number, author_id in enumerate(self.pick(authors, size)):
+                # Даты растут вместе с id, как при обычной публикации.
+                moment = self.start + span * (
+                    start + number + self.rng.random()
+                ) / count
+                self.post_times.append(moment)
+                group_id = None
+                if groups and self.rng.random() < 0.7:
+                    group_id = self.pick(groups, 1)[0]
+                image = ''
+                if images and self.rng.random() < image_ratio:
+                    image = self.rng.choice(images)
+                yield Post(
+                    text=self.text(5, 60),
+                    pub_date=self.datetime(moment),
+                    author_id=author_id,
+                    group_id=group_id,
+                    image=image,
+                )
+
+    def comments(self, count, user_ids, post_ids, reply_ratio):
+        if not post_ids:
+            return
+        authors = self.popularity(user_ids)
+        posts = self.popularity(range(len(post_ids)))
+        first_id = self.next_id(Comment)
+        last_in_post = {}
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            chosen = zip(self.pick(posts, size), self.pick(authors, size))
+            for number, (index, author_id) in enumerate(chosen):
+                comment_id = first_id + start + number
+                post_id = post_ids[index]
+                parent_id, parent_path = None, ''
+                last = last_in_post.get(post_id)
+                if (last is not None
+                        and self.rng.random() < reply_ratio
+                        and len(last[1]) + Comment.PATH_STEP
+                        <= Comment.PATH_MAX_LENGTH):
+                    parent_id, parent_path = last
+                path = Comment.make_path(comment_id, parent_path)
+                last_in_post[post_id] = (comment_id, path)
+                delay = self.rng.expovariate(1 / 86400)
+                moment = min(self.post_times[index] + delay, self.end)
+                yield Comment(
+                    id=comment_id,
+                    text=self.text(1, 25),
+                    created=self.datetime(moment),
+                    post_id=post_id,
+                    author_id=author_id,
+                    parent_id=parent_id,
+                    path=path,
+                )
+
+    def follows(self, user_ids, mean):
+        if len(user_ids) < 2:
+            return
+        authors = self.popularity(user_ids)
+        for user_id in user_ids:
+            # Парето с показателем 1.5 имеет среднее 3.
+            wanted = int(self.rng.paretovariate(1.5) * mean / 3)
+            wanted = min(wanted, len(user_ids) - 1)
+            chosen = set(self.pick(authors, wanted))
+            chosen.discard(user_id)
+            for author_id in sorted(chosen):
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    @staticmethod
+    def datetime(timestamp):
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc)
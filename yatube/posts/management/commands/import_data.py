@@ -0,0 +1,339 @@
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import counting
+from posts.converters import parse_id
+from posts.models import Comment, Group, Post
+from posts.utils import keep_timestamps, next_free_id, taken_ids
+
+User = get_user_model()
+
+# Без этих полей строку не загрузить.
+REQUIRED_FIELDS = {
+    'posts': ('text', 'author'),
+    'comments': ('text', 'author', 'post'),
+}
+
+# Поля с id записей: разбираются по правилам IdConverter.
+ID_FIELDS = ('id', 'post', 'parent')
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает посты или комментарии из JSONL или CSV '
+        '(можно .gz, «-» — stdin). Авторы и группы ищутся по username '
+        'и slug пачками, строки вставляются bulk_create, каждая пачка '
+        'в своей транзакции. Счётчики пересчитываются один раз в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=('posts', 'comments'))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            default='jsonl')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных авторов без пароля, '
+                 'а не пропускать их строки.'
+        )
+
+    def handle(self, *args, **options):
+        self.create_users = options['create_users']
+        self.users = {}
+        self.groups = {}
+        self.skipped = Counter()
+        # Явные id пропущенных строк: ответы на них тоже пропускаются.
+        self.dropped = set()
+        self.affected_groups = set()
+        self.affected_authors = set()
+        load = getattr(self, f'load_{options["table"]}')
+        if not connection.in_atomic_block:
+            # Прагмы разовой загрузки: synchronous=OFF и большой кеш
+            # страниц. Внутри транзакции SQLite их менять не даёт.
+            connection.ensure_connection()
+            connection.use_profile('bulk')
+        count = 0
+        started = time.monotonic()
+        with self.open(options['path']) as file, \
+                keep_timestamps(Post, Comment):
+            rows = self.read(
+                file, options['format'], REQUIRED_FIELDS[options['table']]
+            )
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    count += load(batch)
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{options["table"]}: {count} за {elapsed:.1f} с '
+                    f'({count / elapsed:.0f} строк/с)'
+                )
+        self.rebuild(options['table'])
+        for reason, skipped in sorted(self.skipped.items()):
+            self.stdout.write(f'Пропущено ({reason}): {skipped}')
+
+    @staticmethod
+    def open(path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
+
+    @classmethod
+    def read(cls, file, fmt, required):
+        """
+        Строки файла как словари. Заголовок CSV проверяется до первой
+        пачки, у JSONL поля проверяются в каждой строке.
+        """
+        if fmt == 'csv':
+            reader = csv.DictReader(file)
+            missing = [
+                field for field in required
+                if field not in (reader.fieldnames or ())
+            ]
+            if missing:
+                raise CommandError(f'Нет столбцов: {", ".join(missing)}')
+            for row in reader:
+                yield cls.clean(row, reader.line_num)
+            return
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise CommandError(f'Строка {number}: {exc}')
+            missing = [field for field in required if field not in row]
+            if missing:
+                raise CommandError(
+                    f'Строка {number}: нет полей {", ".join(missing)}'
+                )
+            yield cls.clean(row, number)
+
+    @staticmethod
+    def clean(row, number):
+        """
+        Проверяет имя автора и заменяет поля с id числами (пустые —
+        на None). Имя, которое не пропустил бы валидатор username,
+        сломало бы адреса профиля на всех страницах с постами автора.
+        """
+        try:
+            row['author'] = User._meta.get_field('username').clean(
+                row['author'], None
+            )
+        except ValidationError as exc:
+            raise CommandError(
+                f'Строка {number}: неверное имя автора '
+                f'{row["author"]!r}: {" ".join(exc.messages)}'
+            )
+        for field in ID_FIELDS:
+            value = row.get(field)
+            if value is None or value == '':
+                row[field] = None
+                continue
+            row[field] = parse_id(value)
+            if row[field] is None:
+                raise CommandError(
+                    f'Строка {number}: неверный {field}: {value!r}'
+                )
+        return row
+
+    def resolve(self, cache, model, field, values):
+        """Дополняет cache id объектов по значениям field одним запросом."""
+        missing = {value for value in values if value not in cache}
+        if missing:
+            cache.update(model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'id'))
+        return missing - cache.keys()
+
+    def resolve_authors(self, batch):
+        missing = self.resolve(
+            self.users, User, 'username', {row['author'] for row in batch}
+        )
+        if missing and self.create_users:
+            # Один хеш на всех: вычислять его для каждого слишком дорого.
+            password = make_password(None)
+            User.objects.bulk_create(
+                User(username=username, password=password)
+                for username in missing
+            )
+            self.resolve(self.users, User, 'username', missing)
+
+    @staticmethod
+    def explicit_ids(batch):
+        return {row['id'] for row in batch if row['id']}
+
+    @staticmethod
+    def first_new_id(model, explicit):
+        """
+        Первый id для строк пачки без явного id. Транзакция уже держит
+        блокировку записи (BEGIN IMMEDIATE), так что выданные id никто
+        не займёт, а явные id пачки остаются ниже.
+        """
+        return max([next_free_id(model), *(i + 1 for i in explicit)])
+
+    def skip(self, row, reason):
+        self.skipped[reason] += 1
+        if row['id']:
+            self.dropped.add(row['id'])
+
+    def claim(self, taken, row):
+        """
+        Занимает явный id строки. Уже занятый id (в базе, архиве или
+        раньше в файле) не даёт вставить пачку, поэтому строка
+        пропускается.
+        """
+        if row['id'] in taken:
+            self.skip(row, 'занятый id')
+            return False
+        taken.add(row['id'])
+        return True
+
+    def load_posts(self, batch):
+        self.resolve_authors(batch)
+        self.resolve(
+            self.groups, Group, 'slug',
+            {row['group'] for row in batch if row.get('group')}
+        )
+        explicit = self.explicit_ids(batch)
+        taken = taken_ids(Post, explicit)
+        # id выдаются здесь, а не базой: SQLite не знает об архиве.
+        next_id = self.first_new_id(Post, explicit)
+        posts = []
+        for row in batch:
+            author_id = self.users.get(row['author'])
+            if author_id is None:
+                self.skip(row, 'неизвестный автор')
+                continue
+            group_id = None
+            if row.get('group'):
+                group_id = self.groups.get(row['group'])
+                if group_id is None:
+                    self.skip(row, 'неизвестная группа')
+                    continue
+            post_id = row['id']
+            if post_id and not self.claim(taken, row):
+                continue
+            if not post_id:
+                post_id, next_id = next_id, next_id + 1
+            if group_id is not None:
+                self.affected_groups.add(group_id)
+            self.affected_authors.add(author_id)
+            posts.append(Post(
+                id=post_id,
+                text=row['text'],
+                pub_date=self.datetime(row.get('pub_date')),
+                author_id=author_id,
+                group_id=group_id,
+                image=row.get('image') or '',
+            ))
+        Post.objects.bulk_create(posts)
+        return len(posts)
+
+    def load_comments(self, batch):
+        self.resolve_authors(batch)
+        post_ids = set(Post.objects.filter(
+            id__in={row['post'] for row in batch}
+        ).values_list('id', flat=True))
+        # Родители: id -> (пост, путь).
+        parents = {
+            comment_id: (post_id, path)
+            for comment_id, post_id, path in Comment.objects.filter(
+                id__in={row['parent'] for row in batch if row['parent']}
+            ).values_list('id', 'post_id', 'path')
+        }
+        explicit = self.explicit_ids(batch)
+        taken = taken_ids(Comment, explicit)
+        next_id = self.first_new_id(Comment, explicit)
+        comments = []
+        for row in batch:
+            author_id = self.users.get(row['author'])
+            post_id = row['post']
+            if author_id is None:
+                self.skip(row, 'неизвестный автор')
+                continue
+            if post_id not in post_ids:
+                self.skip(row, 'неизвестный пост')
+                continue
+            parent_id, parent_path = row['parent'], ''
+            if parent_id:
+                # Родитель должен идти в файле раньше ответа. Если его
+                # строка пропущена, в базе под тем же id другой
+                # комментарий.
+                parent_post_id, parent_path = parents.get(
+                    parent_id, (None, None)
+                )
+                if parent_path is None or parent_id in self.dropped:
+                    self.skip(row, 'неизвестный родитель')
+                    continue
+                if parent_post_id != post_id:
+                    self.skip(row, 'родитель из другого поста')
+                    continue
+                if (len(parent_path) + Comment.PATH_STEP
+                        > Comment.PATH_MAX_LENGTH):
+                    # Слишком глубокая ветка: отвечаем на уровень выше,
+                    # как Comment.save().
+                    parent_path = parent_path[:-Comment.PATH_STEP]
+                    parent_id = int(parent_path[-Comment.PATH_STEP:])
+            comment_id = row['id']
+            if comment_id and not self.claim(taken, row):
+                continue
+            if not comment_id:
+                comment_id, next_id = next_id, next_id + 1
+            path = Comment.make_path(comment_id, parent_path)
+            parents[comment_id] = (post_id, path)
+            comments.append(Comment(
+                id=comment_id,
+                text=row['text'],
+                created=self.datetime(row.get('created')),
+                post_id=post_id,
+                author_id=author_id,
+                parent_id=parent_id,
+                path=path,
+            ))
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    @staticmethod
+    def datetime(value):
+        if not value:
+            return timezone.now()
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f'Неверная дата: {value}')
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def rebuild(self, table):
+        """Пересчёт производных данных один раз после загрузки."""
+        if table == 'posts':
+            counting.invalidate(
+                Post,
+                group_id=self.affected_groups,
+                author_id=self.affected_authors,
+            )
+        else:
+            counting.invalidate(Comment)
+        # Обновляет статистику планировщика для изменившихся таблиц.
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA optimize')
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import deletion
+from posts.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет отложенные удаления пользователей, постов и групп '
+        'пачками в коротких транзакциях. С --interval ждёт новые задания.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument(
+            '--pause', type=float, default=None,
+            help='Пауза между пачками в секундах.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Проверять новые задания каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for job in DeletionJob.objects.filter(finished__isnull=True):
+                self.process(job, options)
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def process(self, job, options):
+        started = time.monotonic()
+        try:
+            deletion.run(
+                job, options['chunk_size'], options['pause'],
+                progress=self.progress,
+            )
+        except Exception as exc:
+            # Задание продолжится со следующего запуска.
+            job.error = repr(exc)
+            job.save(update_fields=['error'])
+            self.stderr.write(f'{job}: {exc!r}')
+            return
+        self.stdout.write(
+            f'{job}: удалено, {job.processed} строк '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+
+    def progress(self, job):
+        self.stdout.write(f'{job}: обработано {job.processed} строк')
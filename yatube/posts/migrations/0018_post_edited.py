@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_deletionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='edited',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='edited',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -1,12 +1,15 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 
 
 User = get_user_model()
 
 
 class Post(models.Model):
+    is_archived = False
+
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -36,16 +39,29 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # Версия правки для условных запросов (posts/conditional.py).
+    edited = models.DateTimeField(
+        'Дата изменения',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     def __str__(self) -> str:
         return self.text[:settings.SYMBOLS_IN_STR]
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.edited = timezone.now()
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-pub_date']
 
 
 class Group(models.Model):
-    title = models.CharField(max_length=200)
+    # Индекс для поиска по началу названия в админке.
+    title = models.CharField(max_length=200, db_index=True)
     slug = models.SlugField(unique=True)
     description = models.TextField()
 
@@ -53,7 +69,33 @@ class Group(models.Model):
         return self.title
 
 
+def check_path(path):
+    """
+    Пустой путь (строка из bulk_create или недописанная) превратил бы
+    диапазон ветки в все комментарии поста.
+    """
+    if not path:
+        raise ValueError('Комментарий без материализованного пути')
+    return path
+
+
+class CommentQuerySet(models.QuerySet):
+    def subtree(self, comment):
+        """Ветка комментария одним диапазоном по индексу (post, path)."""
+        path = check_path(comment.path)
+        return self.filter(
+            post_id=comment.post_id,
+            path__gte=path,
+            path__lt=path + Comment.PATH_END,
+        )
+
+
 class Comment(models.Model):
+    PATH_STEP = 10
+    PATH_MAX_LENGTH = 250
+    # Символ, следующий в ASCII за цифрами: верхняя граница ветки.
+    PATH_END = ':'
+
     text = models.TextField(
         'Текст'
     )
@@ -73,6 +115,139 @@ class Comment(models.Model):
         related_name='comments',
         verbose_name='Автор'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на'
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=PATH_MAX_LENGTH,
+        blank=True,
+        editable=False
+    )
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
+
+    @property
+    def depth(self):
+        return max(len(self.path) // self.PATH_STEP - 1, 0)
+
+    @classmethod
+    def make_path(cls, pk, parent_path=''):
+        """
+        Материализованный путь: id всех предков и самого комментария,
+        дополненные нулями до PATH_STEP знаков.
+        """
+        return parent_path + str(pk).zfill(cls.PATH_STEP)
+
+    def build_path(self):
+        if self.parent is None:
+            return self.make_path(self.pk)
+        return self.make_path(self.pk, self.parent.path)
+
+    def save(self, *args, **kwargs):
+        if (self.parent is not None
+                and len(self.parent.path) + self.PATH_STEP
+                > self.PATH_MAX_LENGTH):
+            # Слишком глубокая ветка: отвечаем на уровень выше.
+            self.parent = self.parent.parent
+        if self.path:
+            super().save(*args, **kwargs)
+            return
+        # Путь содержит id, который известен только после вставки:
+        # вставка и запись пути проходят вместе или не проходят вовсе.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self.path = self.build_path()
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+
+class ArchivedPost(models.Model):
+    """
+    Старый пост, перенесённый командой archive_posts из posts_post,
+    чтобы горячая таблица и её индексы оставались маленькими.
+    id сохраняется, поэтому адреса постов не меняются.
+    """
+    is_archived = True
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор'
+    )
+    group = models.ForeignKey(
+        'Group',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа'
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+    edited = models.DateTimeField('Дата изменения', null=True, blank=True)
+    archived = models.DateTimeField('Дата архивации', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.text[:settings.SYMBOLS_IN_STR]
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', 'pub_date']),
+        ]
+
+
+class ArchivedComment(models.Model):
+    """Комментарий архивного поста, только для чтения."""
+    PATH_STEP = Comment.PATH_STEP
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст')
+    created = models.DateTimeField('Дата публикации')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор'
+    )
+    parent_id = models.IntegerField('Ответ на', blank=True, null=True)
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=Comment.PATH_MAX_LENGTH,
+        blank=True
+    )
+
+    objects = CommentQuerySet.as_manager()
+
+    depth = Comment.depth
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
 
 
 class Follow(models.Model):
@@ -95,3 +270,33 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name='unique_follow')
         ]
+
+
+class DeletionJob(models.Model):
+    """
+    Отложенное удаление пользователя, поста или группы.
+    Объект скрывается сразу, а связанные строки удаляет пачками
+    команда process_deletions (posts/deletion.py).
+    """
+    MODELS = (
+        ('user', 'Пользователь'),
+        ('post', 'Пост'),
+        ('group', 'Группа'),
+    )
+
+    model = models.CharField('Модель', max_length=10, choices=MODELS)
+    object_id = models.IntegerField('id объекта')
+    object_repr = models.CharField('Объект', max_length=200)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', blank=True, null=True)
+    processed = models.PositiveIntegerField('Обработано строк', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.get_model_display()} {self.object_repr}'
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['finished', 'created']),
+        ]
@@ -0,0 +1,99 @@
+"""
+Массовые операции модерации из админки.
+
+Вместо save() и delete() на каждый объект строки обновляются
+и удаляются пачками по MODERATION_CHUNK_SIZE, каждая пачка — один
+UPDATE или DELETE в своей короткой транзакции. Сигналы при этом
+не отправляются, поэтому счётчики постов и страницы в кешах прокси
+сбрасываются явно. Страницы отдельных постов при массовых операциях
+с постами не сбрасываются и устаревают не дольше
+ANONYMOUS_CACHE_SECONDS.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from core import counting, purge
+from . import deletion
+from .models import Comment, Group, Post, User
+from .utils import page_paths
+
+
+def drain(step):
+    return deletion.drain(step, settings.MODERATION_CHUNK_SIZE)
+
+
+def group_ids(posts):
+    return set(
+        posts.order_by().values_list('group_id', flat=True).distinct()
+    ) - {None}
+
+
+def purge_feeds(groups, authors):
+    """Сбрасывает в кешах прокси ленты групп и авторов и главную."""
+    if purge.enabled():
+        purge.purge(page_paths(
+            group_slugs=Group.objects.filter(
+                id__in=groups
+            ).values_list('slug', flat=True),
+            usernames=User.objects.filter(
+                id__in=authors
+            ).values_list('username', flat=True),
+            index=True,
+        ))
+
+
+def move_to_group(posts, group):
+    """Переносит посты выборки в группу group."""
+    groups = group_ids(posts) | {group.id}
+    authors = author_ids(posts)
+    moved = drain(lambda size: deletion.update_chunk(
+        posts.exclude(group=group), size,
+        group=group, edited=timezone.now()
+    ))
+    counting.invalidate(Post, group_id=groups, author_id=authors)
+    purge_feeds(groups, authors)
+    return moved
+
+
+def delete_posts(posts):
+    """Удаляет посты выборки вместе с комментариями к ним."""
+    groups = group_ids(posts)
+    authors = author_ids(posts)
+    deleted = drain(
+        lambda size: deletion.delete_posts(posts, Comment, size)
+    )
+    counting.invalidate(Post, group_id=groups, author_id=authors)
+    counting.invalidate(Comment)
+    purge_feeds(groups, authors)
+    return deleted
+
+
+def delete_comments(comments):
+    """Удаляет комментарии выборки вместе с ветками ответов."""
+    posts = set(
+        comments.order_by().values_list('post_id', flat=True).distinct()
+    ) if purge.enabled() else ()
+    deleted = drain(
+        lambda size: deletion.delete_subtrees(comments, size)
+    )
+    counting.invalidate(Comment)
+    purge.purge(page_paths(posts))
+    return deleted
+
+
+def author_ids(queryset):
+    return set(
+        queryset.order_by().values_list('author_id', flat=True).distinct()
+    )
+
+
+def delete_posts_by_authors(posts):
+    """Удаляет все посты авторов постов выборки."""
+    return delete_posts(Post.objects.filter(author_id__in=author_ids(posts)))
+
+
+def delete_comments_by_authors(comments):
+    """Удаляет все комментарии авторов комментариев выборки."""
+    return delete_comments(
+        Comment.objects.filter(author_id__in=author_ids(comments))
+    )
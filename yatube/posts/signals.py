@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import counting, metrics, objects, purge
+from .models import ArchivedPost, Comment, Follow, Group, Post
+from .utils import page_paths
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+def count_created(sender, created, **kwargs):
+    if created:
+        metrics.inc(
+            'yatube_objects_created_total', model=sender._meta.model_name
+        )
+
+
+@receiver(post_save, sender=Post)
+def adjust_post_counts(sender, instance, created, **kwargs):
+    if created:
+        counting.adjust(instance, 1, ('group_id', 'author_id'))
+
+
+@receiver(post_delete, sender=Post)
+def adjust_deleted_post_counts(sender, instance, **kwargs):
+    counting.adjust(instance, -1, ('group_id', 'author_id'))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=ArchivedPost)
+@receiver(post_delete, sender=ArchivedPost)
+def forget_post(sender, instance, **kwargs):
+    # Архивный пост кешируется под ключом горячего: id у них общие.
+    objects.forget(Post, 'id', [instance.pk])
+
+
+def forget_renamed(sender, instance, field, update_fields):
+    """
+    Сбрасывает кеш под прежним значением field: после переименования
+    старый адрес иначе отдавал бы объект из кеша.
+    """
+    if instance.pk is None or (
+            update_fields is not None and field not in update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list(
+        field, flat=True
+    ).first()
+    if old is not None and old != getattr(instance, field):
+        objects.forget(sender, field, [old])
+
+
+@receiver(pre_save, sender=Group)
+def forget_renamed_group(sender, instance, update_fields, **kwargs):
+    forget_renamed(sender, instance, 'slug', update_fields)
+
+
+@receiver(pre_save, sender=User)
+def forget_renamed_user(sender, instance, update_fields, **kwargs):
+    forget_renamed(sender, instance, 'username', update_fields)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group(sender, instance, **kwargs):
+    objects.forget(Group, 'slug', [instance.slug])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    objects.forget(User, 'username', [instance.username])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    if purge.enabled():
+        purge.purge(page_paths(
+            [instance.pk],
+            [instance.group.slug] if instance.group_id else [],
+            [instance.author.username],
+            index=True,
+        ))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    if purge.enabled():
+        purge.purge(page_paths([instance.post_id]))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    if purge.enabled():
+        purge.purge(page_paths(group_slugs=[instance.slug]))
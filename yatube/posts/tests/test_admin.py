@@ -0,0 +1,227 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..admin import PostAdmin
+from ..models import Comment, DeletionJob, Group, Post
+from ..utils import author_post_count
+
+User = get_user_model()
+
+
+class AdminAutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.users = [
+            User.objects.create(username=name)
+            for name in ('anna', 'anton', 'boris')
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.users[0], group=cls.group
+        )
+        Comment.objects.create(
+            text='Комментарий', post=cls.post, author=cls.users[2]
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def autocomplete(self, model, term):
+        response = self.client.get(
+            reverse(f'admin:{model}_autocomplete'), {'term': term}
+        )
+        return [item['text'] for item in response.json()['results']]
+
+    def test_users_are_found_by_prefix(self):
+        """Проверяем, что пользователи ищутся по началу имени."""
+        self.assertEqual(
+            self.autocomplete('auth_user', 'an'), ['anna', 'anton']
+        )
+        self.assertEqual(self.autocomplete('auth_user', 'nna'), [])
+
+    def test_posts_are_found_by_id_and_author(self):
+        """Проверяем, что посты ищутся по id и по автору."""
+        self.assertEqual(
+            self.autocomplete('posts_post', str(self.post.id)),
+            [str(self.post)]
+        )
+        self.assertEqual(
+            self.autocomplete('posts_post', 'ann'), [str(self.post)]
+        )
+
+    def test_groups_are_found_by_title_prefix(self):
+        """Проверяем, что группа ищется по началу названия."""
+        self.assertEqual(self.autocomplete('posts_group', 'Гру'), ['Группа'])
+        self.assertEqual(self.autocomplete('posts_group', 'gro'), ['Группа'])
+
+    def test_junk_id_is_not_searched_as_number(self):
+        """Проверяем, что не-ASCII цифры и длинные числа не ломают поиск."""
+        for term in ('²', '9' * 30):
+            with self.subTest(term=term):
+                self.assertEqual(self.autocomplete('posts_post', term), [])
+                response = self.client.get(
+                    reverse('admin:posts_post_changelist'), {'q': term}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_text_search_scans_only_recent_rows(self):
+        """Проверяем, что поиск по тексту смотрит только свежие посты."""
+        Post.objects.create(text='Новый пост', author=self.users[1])
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        with mock.patch.object(PostAdmin, 'search_scan_rows', 1):
+            response = self.client.get(url, {'q': 'пост'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_change_forms_do_not_list_all_objects(self):
+        """Проверяем, что формы не выводят все объекты в <select>."""
+        comment = Comment.objects.get()
+        for url in (
+            reverse('admin:posts_comment_change', args=[comment.id]),
+            reverse('admin:posts_post_changelist'),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, '>anton</option>')
+
+    def test_comment_post_and_parent_are_read_only(self):
+        """Проверяем, что у комментария нельзя сменить пост и родителя."""
+        comment = Comment.objects.get()
+        other = Post.objects.create(text='Другой', author=self.users[1])
+        self.client.post(
+            reverse('admin:posts_comment_change', args=[comment.id]),
+            {'text': 'Исправлено', 'author': comment.author_id,
+             'post': other.id, 'parent': ''},
+        )
+        comment.refresh_from_db()
+        self.assertEqual(comment.text, 'Исправлено')
+        self.assertEqual(comment.post, self.post)
+        response = self.client.get(reverse('admin:posts_comment_add'))
+        self.assertIn('post', response.context['adminform'].form.fields)
+
+
+class AdminBulkActionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.spammer = User.objects.create(username='spammer')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.spam = [
+            Post.objects.create(text=f'Спам {number}', author=cls.spammer)
+            for number in range(3)
+        ]
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        root = Comment.objects.create(
+            text='Вопрос', post=cls.post, author=cls.author
+        )
+        cls.reply = Comment.objects.create(
+            text='Спам', post=cls.post, author=cls.spammer, parent=root
+        )
+        Comment.objects.create(
+            text='Ответ на спам', post=cls.post, author=cls.author,
+            parent=cls.reply
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def action(self, model, action, selected, query='', **data):
+        url = reverse(f'admin:posts_{model}_changelist') + query
+        return self.client.post(url, {
+            'action': action,
+            '_selected_action': [obj.id for obj in selected],
+            **data,
+        }, follow=True)
+
+    def test_move_to_group(self):
+        """Проверяем, что посты переносятся в группу одним действием."""
+        response = self.action(
+            'post', 'move_to_group', self.spam[:2], group=self.group.id
+        )
+        self.assertContains(response, 'Перенесено постов: 2.')
+        self.assertEqual(self.group.posts.count(), 2)
+
+    def test_move_to_group_requires_group(self):
+        """Проверяем, что без группы посты не переносятся."""
+        response = self.action('post', 'move_to_group', self.spam)
+        self.assertContains(response, 'Выберите группу.')
+        self.assertFalse(self.group.posts.exists())
+
+    def test_delete_posts_by_author(self):
+        """Проверяем удаление всех постов авторов выбранных постов."""
+        response = self.action('post', 'delete_by_authors', self.spam[:1])
+        self.assertContains(response, 'Удалено строк: 3.')
+        self.assertQuerysetEqual(
+            Post.objects.all(), [self.post.id], lambda post: post.id
+        )
+
+    @override_settings(COUNT_EXACT_THRESHOLD=1)
+    def test_bulk_delete_resets_author_counts(self):
+        """Проверяем, что после удаления пачкой число постов автора новое."""
+        cache.clear()
+        self.assertEqual(author_post_count(self.spammer.id), 3)
+        self.action('post', 'delete_by_authors', self.spam[:1])
+        self.assertEqual(author_post_count(self.spammer.id), 0)
+
+    def test_delete_comments_by_author_removes_branches(self):
+        """Проверяем, что вместе с комментарием удаляются ответы на него."""
+        self.action('comment', 'delete_by_authors', [self.reply])
+        self.assertQuerysetEqual(
+            Comment.objects.all(), ['Вопрос'], lambda comment: comment.text
+        )
+
+    def test_delete_matching_search(self):
+        """Проверяем удаление всего, что найдено поиском."""
+        response = self.action(
+            'post', 'delete_matching_search', self.spam[:1], '?q=spam'
+        )
+        self.assertContains(response, 'Удалено строк: 3.')
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_delete_matching_search_requires_search(self):
+        """Проверяем, что без поиска и фильтров ничего не удаляется."""
+        response = self.action('post', 'delete_matching_search', self.spam)
+        self.assertContains(response, 'Сначала задайте поиск или фильтр.')
+        self.assertEqual(Post.objects.count(), 4)
+
+
+class AdminBackgroundDeleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.staff.user_permissions.set(Permission.objects.filter(
+            codename__in=('view_user', 'delete_user')
+        ))
+        cls.author = User.objects.create(username='author')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_cascade_needs_delete_permissions(self):
+        """Проверяем, что без прав на посты нельзя удалить их автора."""
+        url = reverse('admin:auth_user_delete', args=[self.author.id])
+        response = self.client.get(url)
+        self.assertIn('post', response.context['perms_lacking'])
+        self.assertEqual(
+            self.client.post(url, {'post': 'yes'}).status_code,
+            HTTPStatus.FORBIDDEN
+        )
+        self.assertFalse(DeletionJob.objects.exists())
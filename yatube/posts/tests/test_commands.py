@@ -0,0 +1,489 @@
+import csv
+import gzip
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.counting import count, count_key
+from .. import deletion, export
+from ..models import (
+    ArchivedComment, ArchivedPost, Comment, DeletionJob, Follow, Group, Post
+)
+from ..utils import author_post_count, next_free_id
+
+User = get_user_model()
+
+
+class GenerateDataCommandTest(TestCase):
+    options = {
+        'users': 50,
+        'groups': 3,
+        'posts': 120,
+        'comments': 300,
+        'follows': 5,
+        'seed': 7,
+        'until': None,
+        'batch_size': 40,
+        'stdout': StringIO(),
+    }
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('id').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date'
+            )),
+            list(Follow.objects.order_by('id').values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_generated_volume(self):
+        """Проверяем объём и связность сгенерированных данных."""
+        call_command('generate_data', **self.options)
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+        for reply in Comment.objects.filter(parent__isnull=False):
+            with self.subTest(reply=reply.id):
+                self.assertEqual(
+                    reply.path,
+                    Comment.make_path(reply.id, reply.parent.path)
+                )
+
+    def test_same_seed_gives_same_data(self):
+        """Проверяем воспроизводимость по seed."""
+        call_command('generate_data', **self.options)
+        first = self.snapshot()
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        call_command('generate_data', **self.options)
+        self.assertEqual(self.snapshot(), first)
+
+
+class ArchivePostsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.fresh = Post.objects.create(text='Свежий пост', author=cls.user)
+        cls.old = [
+            Post.objects.create(text=f'Старый пост {i}', author=cls.user)
+            for i in range(3)
+        ]
+        Post.objects.filter(id__in=[post.id for post in cls.old]).update(
+            pub_date=timezone.now() - timedelta(days=100)
+        )
+        cls.root = Comment.objects.create(
+            text='Корень', post=cls.old[0], author=cls.user
+        )
+        cls.reply = Comment.objects.create(
+            text='Ответ', post=cls.old[0], author=cls.user, parent=cls.root
+        )
+        Comment.objects.create(
+            text='Комментарий', post=cls.fresh, author=cls.user
+        )
+
+    def test_old_posts_are_moved(self):
+        """Проверяем, что старые посты и их комментарии ушли в архив."""
+        # Пачка в одну строку: комментарии поста переносятся по частям.
+        call_command(
+            'archive_posts', days=30, batch_size=1, stdout=StringIO()
+        )
+        self.assertEqual(list(Post.objects.all()), [self.fresh])
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list('id', flat=True)),
+            {post.id for post in self.old}
+        )
+        self.assertEqual(Comment.objects.count(), 1)
+        reply = ArchivedComment.objects.get(id=self.reply.id)
+        self.assertEqual(reply.post_id, self.old[0].id)
+        self.assertEqual(reply.parent_id, self.root.id)
+        self.assertEqual(reply.path, self.reply.path)
+
+    def test_new_ids_skip_archived_ones(self):
+        """Проверяем, что явные id выдаются после архивных."""
+        call_command('archive_posts', days=-1, stdout=StringIO())
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(next_free_id(Post), self.old[-1].id + 1)
+        self.assertEqual(next_free_id(Comment), self.reply.id + 2)
+
+
+class ProcessDeletionsCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='leaving')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.user,
+                                group=cls.group)
+            for i in range(5)
+        ]
+        cls.other_post = Post.objects.create(
+            text='Чужой пост', author=cls.other, group=cls.group
+        )
+        for post in cls.posts:
+            parent = None
+            for i in range(3):
+                parent = Comment.objects.create(
+                    text='Ответ', post=post, author=cls.other, parent=parent
+                )
+        # Ветка пользователя под чужим постом с ответом другого автора.
+        root = Comment.objects.create(
+            text='Корень', post=cls.other_post, author=cls.user
+        )
+        Comment.objects.create(
+            text='Ответ', post=cls.other_post, author=cls.other, parent=root
+        )
+        cls.kept = Comment.objects.create(
+            text='Остаётся', post=cls.other_post, author=cls.other
+        )
+        Follow.objects.create(user=cls.user, author=cls.other)
+        Follow.objects.create(user=cls.other, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        # Откат теста не сбрасывает кеш скрытых объектов.
+        self.addCleanup(cache.clear)
+
+    def process(self):
+        call_command(
+            'process_deletions', chunk_size=2, pause=0, stdout=StringIO()
+        )
+
+    def test_user_is_hidden_before_processing(self):
+        """Проверяем, что пользователь скрыт сразу после постановки."""
+        deletion.schedule(self.user)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.posts[0].id])
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Чужой пост']
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.other_post.id])
+        )
+        authors = [comment.author for comment in response.context['comments']]
+        self.assertNotIn(self.user, authors)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+    def test_user_is_deleted_in_chunks(self):
+        """Проверяем, что пользователь удалён вместе со связями."""
+        job = deletion.schedule(self.user)
+        self.process()
+        job.refresh_from_db()
+        self.assertIsNotNone(job.finished)
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        self.assertEqual(list(Post.objects.all()), [self.other_post])
+        self.assertEqual(list(Comment.objects.all()), [self.kept])
+        self.assertFalse(Follow.objects.exists())
+        # 5 постов, 15 комментариев к ним, ветка из 2, 2 подписки.
+        self.assertEqual(job.processed, 24)
+
+    @override_settings(COUNT_EXACT_THRESHOLD=1)
+    def test_counts_are_reset_after_job(self):
+        """Проверяем, что счётчики постов сброшены после удаления."""
+        group_key = count_key(Post, group_id=self.group.id)
+        self.assertEqual(author_post_count(self.user.id), 5)
+        self.assertEqual(count(self.group.posts.all(), group_key), 6)
+        deletion.schedule(self.user)
+        self.process()
+        self.assertEqual(author_post_count(self.user.id), 0)
+        self.assertEqual(count(self.group.posts.all(), group_key), 1)
+
+    def test_group_posts_are_detached(self):
+        """Проверяем, что посты удалённой группы остаются без группы."""
+        deletion.schedule(self.group)
+        self.process()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_post_is_deleted_with_comments(self):
+        """Проверяем, что пост удалён вместе с веткой комментариев."""
+        post = self.posts[0]
+        deletion.schedule(post)
+        self.process()
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        self.assertFalse(Comment.objects.filter(post_id=post.id).exists())
+        self.assertFalse(DeletionJob.objects.filter(
+            finished__isnull=True
+        ).exists())
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportDataCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.user)
+            for number in range(5)
+        ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'posts.jsonl.gz')
+
+    def export(self, *args):
+        call_command(
+            'export_data', *args, output=self.path, stderr=StringIO()
+        )
+
+    def test_gzip_jsonl_export_resumes_from_last_id(self):
+        """Проверяем, что продолженная выгрузка дописывается в файл."""
+        after = self.posts[2].id
+        Post.objects.filter(id__gt=after).delete()
+        self.export('posts', '--format', 'jsonl', '--gzip')
+        for number in range(3, 5):
+            Post.objects.create(text=f'Пост {number}', author=self.user)
+        self.export('posts', '--format', 'jsonl', '--gzip',
+                    '--after', str(after))
+        with gzip.open(self.path, 'rt') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(
+            [row['text'] for row in rows],
+            [f'Пост {number}' for number in range(5)]
+        )
+        self.assertEqual(rows[0]['author_id'], self.user.id)
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_interrupted_gzip_export_resumes(self):
+        """Проверяем, что прерванную сжатую выгрузку можно продолжить."""
+        chunks = export.chunks
+
+        def interrupted(*args, **kwargs):
+            generator = chunks(*args, **kwargs)
+            yield next(generator)
+            raise KeyboardInterrupt
+
+        stderr = StringIO()
+        with mock.patch.object(export, 'chunks', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('export_data', 'posts', '--gzip',
+                             output=self.path, stderr=stderr)
+        after = re.search(r'id: (\d+)', stderr.getvalue())[1]
+        self.assertEqual(int(after), self.posts[1].id)
+        self.export('posts', '--gzip', '--after', after)
+        with gzip.open(self.path, 'rt', newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(
+            [row[1] for row in rows[1:]],
+            [f'Пост {number}' for number in range(5)]
+        )
+
+    def test_csv_export_has_header(self):
+        """Проверяем заголовок и строки CSV."""
+        Follow.objects.create(user=self.user, author=User.objects.create(
+            username='author'
+        ))
+        self.export('follows')
+        with open(self.path, newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ['id', 'user_id', 'author_id'])
+        self.assertEqual(len(rows), 2)
+
+
+class ImportDataCommandTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def load(self, table, name, content, *args):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write(content)
+        stdout = StringIO()
+        call_command(
+            'import_data', table, path, '--batch-size', '2', *args,
+            stdout=stdout
+        )
+        return stdout.getvalue()
+
+    def test_posts_are_imported_with_authors_and_groups(self):
+        """Проверяем загрузку постов из JSONL.gz с поиском по username."""
+        rows = [
+            {'text': 'Первый', 'author': 'auth', 'group': 'group',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'text': 'Второй', 'author': 'auth'},
+            {'text': 'Третий', 'author': 'nobody'},
+            {'text': 'Четвёртый', 'author': 'auth', 'group': 'missing'},
+        ]
+        output = self.load(
+            'posts', 'posts.jsonl.gz',
+            ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Второй', 'Первый']
+        )
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertIn('Пропущено (неизвестный автор): 1', output)
+        self.assertIn('Пропущено (неизвестная группа): 1', output)
+
+    def test_unknown_authors_are_created_on_request(self):
+        """Проверяем, что --create-users создаёт авторов без пароля."""
+        self.load(
+            'posts', 'posts.csv', 'text,author\nПост,newcomer\n',
+            '--format', 'csv', '--create-users'
+        )
+        author = User.objects.get(username='newcomer')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(author.posts.count(), 1)
+
+    def test_comment_paths_are_built_from_parents(self):
+        """Проверяем, что ответы из файла попадают в ветку родителя."""
+        post = Post.objects.create(text='Пост', author=self.user, id=10)
+        root = Comment.objects.create(
+            text='Корень', post=post, author=self.user
+        )
+        rows = [
+            {'id': 100, 'text': 'Ответ', 'post': 10, 'author': 'auth',
+             'parent': root.id},
+            {'id': 101, 'text': 'Ответ на ответ', 'post': 10,
+             'author': 'auth', 'parent': 100},
+            {'text': 'Новый', 'post': 10, 'author': 'auth'},
+            {'text': 'Мимо', 'post': 999, 'author': 'auth'},
+        ]
+        self.load(
+            'comments', 'comments.jsonl',
+            ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+        self.assertEqual(
+            [comment.text for comment in Comment.objects.subtree(root)
+             .order_by('path')],
+            ['Корень', 'Ответ', 'Ответ на ответ']
+        )
+        reply = Comment.objects.get(id=101)
+        self.assertEqual(reply.parent_id, 100)
+        self.assertEqual(reply.depth, 2)
+        self.assertEqual(Comment.objects.count(), 4)
+
+    def test_missing_columns_are_reported_before_loading(self):
+        """Проверяем, что без обязательных полей загрузка не начинается."""
+        with self.assertRaisesMessage(CommandError, 'Нет столбцов: post'):
+            self.load(
+                'comments', 'comments.csv', 'text,author\nТекст,auth\n',
+                '--format', 'csv'
+            )
+        with self.assertRaisesMessage(
+            CommandError, 'Строка 1: нет полей author'
+        ):
+            self.load('posts', 'posts.jsonl', '{"text": "Пост"}\n')
+        self.assertFalse(Post.objects.exists())
+
+    def test_taken_ids_are_skipped(self):
+        """Проверяем, что занятые id пропускаются, а не роняют пачку."""
+        Post.objects.create(id=5, text='Есть', author=self.user)
+        ArchivedPost.objects.create(
+            id=6, text='В архиве', author=self.user, pub_date=timezone.now()
+        )
+        rows = [
+            {'text': 'Новый', 'author': 'auth'},
+            {'id': 5, 'text': 'Занят', 'author': 'auth'},
+            {'id': 6, 'text': 'Занят архивом', 'author': 'auth'},
+            {'id': 8, 'text': 'Свободен', 'author': 'auth'},
+            {'id': 8, 'text': 'Повтор', 'author': 'auth'},
+        ]
+        output = self.load(
+            'posts', 'posts.jsonl',
+            ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+        self.assertIn('Пропущено (занятый id): 3', output)
+        self.assertEqual(Post.objects.get(id=8).text, 'Свободен')
+        self.assertEqual(Post.objects.get(text='Новый').id, 7)
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_bad_values_are_reported_with_line_number(self):
+        """Проверяем, что неверные имена и id останавливают загрузку."""
+        cases = [
+            ('posts', {'text': 'Пост', 'author': 'old platform user'},
+             'Строка 2: неверное имя автора'),
+            ('comments', {'text': 'Ответ', 'author': 'auth', 'post': 'x1'},
+             "Строка 2: неверный post: 'x1'"),
+            ('comments', {'text': 'Ответ', 'author': 'auth', 'post': 1,
+                          'parent': '²'},
+             "Строка 2: неверный parent: '²'"),
+        ]
+        for table, row, message in cases:
+            with self.subTest(row=row):
+                rows = [{'text': 'Первый', 'author': 'auth', 'post': 1}, row]
+                with self.assertRaisesMessage(CommandError, message):
+                    self.load(
+                        table, f'{table}.jsonl',
+                        ''.join(json.dumps(row) + '\n' for row in rows),
+                        '--create-users'
+                    )
+        self.assertFalse(User.objects.filter(username__contains=' '))
+
+    def test_replies_to_skipped_parents_are_skipped(self):
+        """Проверяем, что ответ не попадёт к чужому комментарию с тем же id."""
+        post = Post.objects.create(text='Пост', author=self.user)
+        other = Post.objects.create(text='Другой', author=self.user)
+        taken, foreign = [
+            Comment.objects.create(text=text, post=other, author=self.user)
+            for text in ('Занятый', 'Чужой')
+        ]
+        rows = [
+            {'id': taken.id, 'text': 'Корень', 'post': post.id,
+             'author': 'auth'},
+            {'text': 'Ответ', 'post': post.id, 'author': 'auth',
+             'parent': taken.id},
+            {'text': 'Ответ в другой пост', 'post': post.id,
+             'author': 'auth', 'parent': foreign.id},
+        ]
+        output = self.load(
+            'comments', 'comments.jsonl',
+            ''.join(json.dumps(row) + '\n' for row in rows)
+        )
+        self.assertIn('Пропущено (занятый id): 1', output)
+        self.assertIn('Пропущено (неизвестный родитель): 1', output)
+        self.assertIn('Пропущено (родитель из другого поста): 1', output)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    @override_settings(COUNT_EXACT_THRESHOLD=1)
+    def test_import_resets_author_counts(self):
+        """Проверяем, что после загрузки число постов автора новое."""
+        cache.clear()
+        self.assertEqual(author_post_count(self.user.id), 0)
+        self.load(
+            'posts', 'posts.jsonl', '{"text": "Пост", "author": "auth"}\n'
+        )
+        self.assertEqual(author_post_count(self.user.id), 1)
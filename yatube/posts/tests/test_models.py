@@ -1,8 +1,12 @@
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import DatabaseError
 from django.test import TestCase
 from django.conf import settings
 
-from ..models import Post, Group
+from .. import moderation
+from ..models import Comment, CommentQuerySet, Post, Group
 
 User = get_user_model()
 
@@ -78,3 +82,33 @@ class PostModelTest(TestCase):
         for str_field in str_method:
             with self.subTest(str_field=str_field):
                 self.assertIsInstance(str_field, str)
+
+
+class CommentModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def test_failed_path_write_rolls_back_insert(self):
+        """Проверяем, что комментарий не остаётся без пути."""
+        with mock.patch.object(CommentQuerySet, 'update',
+                               side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Comment.objects.create(
+                    post=self.post, author=self.user, text='Комментарий'
+                )
+        self.assertFalse(Comment.objects.exists())
+
+    def test_empty_path_is_rejected(self):
+        """Проверяем, что ветку без пути нельзя выбрать или удалить."""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='2')
+        ])
+        broken = Comment.objects.get(text='2')
+        with self.assertRaises(ValueError):
+            Comment.objects.subtree(broken)
+        with self.assertRaises(ValueError):
+            moderation.delete_comments(Comment.objects.filter(text='2'))
+        self.assertEqual(Comment.objects.count(), 2)
@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create(username=f'author_{i}') for i in range(12)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(
+                text='Тестовый пост',
+                author=author,
+                group=cls.group,
+            )
+        cls.post = Post.objects.first()
+        for author in cls.authors:
+            Comment.objects.create(
+                text='Комментарий',
+                post=cls.post,
+                author=author,
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_public_views_within_budget(self):
+        """Проверяем бюджеты запросов публичных страниц."""
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_posts',
+                    kwargs={'slug': QueryBudgetTest.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': QueryBudgetTest.authors[0]}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': QueryBudgetTest.post.id}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                cache.clear()
+                self.assertWithinBudget(self.client, page)
+                cache.clear()
+                self.assertWithinBudget(self.authorized_client, page)
+
+    def test_follow_index_within_budget(self):
+        """Проверяем бюджет запросов ленты подписок."""
+        self.assertWithinBudget(
+            self.authorized_client, reverse('posts:follow_index')
+        )
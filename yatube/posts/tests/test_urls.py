@@ -61,6 +61,19 @@ class PostURLTests(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
 
+    def test_junk_addresses_are_rejected_without_queries(self):
+        """Проверяем, что мусорные id и имена отсекаются до базы."""
+        for url in (
+            '/posts/abc/',
+            '/posts/1234567890123456789012/',
+            '/posts/1/edit/x/',
+            '/profile/bad%20name/',
+            '/profile/' + 'a' * 151 + '/',
+        ):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
     def test_guest_client_redirects(self):
         """
         Проверка переадресации неавторизованных пользователей.
@@ -1,13 +1,23 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
 from random import randint
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.conf import settings
 from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from ..models import Post, Group, Follow
+from ..models import Post, Group, Follow, Comment
 from ..forms import PostForm
+from ..utils import comments_page
 
 User = get_user_model()
 
@@ -324,3 +334,373 @@ class PaginatorViewTest(TestCase):
                                  posts_on_first_page)
                 self.assertEqual(len(response2.context['page_obj']),
                                  posts_on_second_page)
+
+
+class CommentsPaginatorViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+        )
+        cls.extra_comments = 3
+        for i in range(settings.AMOUNT_OF_COMMENTS + cls.extra_comments):
+            Comment.objects.create(
+                text=f'Комментарий {i}',
+                post=cls.post,
+                author=cls.user,
+            )
+
+    def test_post_detail_shows_first_batch(self):
+        """Проверяем, что post_detail отдаёт только первую порцию."""
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': CommentsPaginatorViewTest.post.id})
+        )
+        self.assertEqual(len(response.context['comments']),
+                         settings.AMOUNT_OF_COMMENTS)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_next_batch_continues_after_cursor(self):
+        """Проверяем, что следующая порция продолжает предыдущую."""
+        url = reverse('posts:post_comments',
+                      kwargs={'post_id': CommentsPaginatorViewTest.post.id})
+        first = self.client.get(url)
+        second = self.client.get(
+            url, {'after': first.context['next_cursor']}
+        )
+        first_ids = [comment.id for comment in first.context['comments']]
+        second_ids = [comment.id for comment in second.context['comments']]
+        self.assertEqual(len(second_ids),
+                         CommentsPaginatorViewTest.extra_comments)
+        self.assertIsNone(second.context['next_cursor'])
+        self.assertEqual(
+            first_ids + second_ids,
+            list(Comment.objects.order_by('path')
+                 .values_list('id', flat=True))
+        )
+
+
+class CommentThreadViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+        )
+        cls.root = Comment.objects.create(
+            text='Корень', post=cls.post, author=cls.user
+        )
+        cls.other = Comment.objects.create(
+            text='Другая ветка', post=cls.post, author=cls.user
+        )
+        parent = cls.root
+        cls.thread = [cls.root]
+        for i in range(5):
+            parent = Comment.objects.create(
+                text=f'Ответ {i}',
+                post=cls.post,
+                author=cls.user,
+                parent=parent,
+            )
+            cls.thread.append(parent)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_replies_follow_their_parent(self):
+        """Проверяем, что ответы идут сразу под родителем."""
+        response = self.client.get(
+            reverse('posts:post_detail',
+                    kwargs={'post_id': CommentThreadViewTest.post.id})
+        )
+        self.assertEqual(
+            response.context['comments'],
+            CommentThreadViewTest.thread + [CommentThreadViewTest.other]
+        )
+        depths = [comment.depth for comment in response.context['comments']]
+        self.assertEqual(depths, [0, 1, 2, 3, 4, 5, 0])
+
+    def test_thread_takes_constant_queries(self):
+        """Проверяем, что ветка любой глубины грузится за два запроса."""
+        url = reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': CommentThreadViewTest.post.id,
+                    'comment_id': CommentThreadViewTest.root.id}
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.context['comments'],
+                         CommentThreadViewTest.thread)
+
+    def test_thread_link_opens_full_page(self):
+        """Проверяем, что ветка по ссылке — страница, а подгрузка — список."""
+        url = reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': CommentThreadViewTest.post.id,
+                    'comment_id': CommentThreadViewTest.root.id}
+        )
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'posts/comment_thread.html')
+        self.assertContains(response, '<html')
+        response = self.client.get(url, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertTemplateNotUsed(response, 'posts/comment_thread.html')
+        self.assertNotContains(response, '<html')
+        self.assertIn('X-Requested-With', response['Vary'])
+
+    def test_reply_is_saved_with_parent(self):
+        """Проверяем сохранение ответа на комментарий."""
+        self.authorized_client.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': CommentThreadViewTest.post.id}),
+            data={'text': 'Ещё ответ',
+                  'parent': CommentThreadViewTest.other.id},
+        )
+        reply = Comment.objects.latest('id')
+        self.assertEqual(reply.parent, CommentThreadViewTest.other)
+        self.assertTrue(reply.path.startswith(
+            CommentThreadViewTest.other.path
+        ))
+        self.assertEqual(reply.depth, 1)
+
+    def test_comment_page_is_built_only_for_invalid_form(self):
+        """Проверяем, что после сохранения комментарии не загружаются."""
+        url = reverse('posts:add_comment',
+                      kwargs={'post_id': CommentThreadViewTest.post.id})
+        with mock.patch(
+            'posts.views.comments_page', wraps=comments_page
+        ) as page:
+            self.authorized_client.post(url, data={'text': 'Ответ'})
+            page.assert_not_called()
+            response = self.authorized_client.post(url, data={'text': ''})
+            page.assert_called_once()
+        self.assertEqual(response.context['comments'][0],
+                         CommentThreadViewTest.root)
+
+    def test_junk_parent_is_ignored(self):
+        """Проверяем, что мусор вместо родителя даёт корневой ответ."""
+        for parent in ('²', '9' * 30, 'abc'):
+            with self.subTest(parent=parent):
+                response = self.authorized_client.post(
+                    reverse('posts:add_comment',
+                            kwargs={'post_id': CommentThreadViewTest.post.id}),
+                    data={'text': f'Ответ {parent}', 'parent': parent},
+                )
+                self.assertEqual(response.status_code, HTTPStatus.FOUND)
+                reply = Comment.objects.latest('id')
+                self.assertIsNone(reply.parent)
+
+
+class ArchiveViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='auth')
+        cls.fresh = [
+            Post.objects.create(text=f'Свежий пост {i}', author=cls.user)
+            for i in range(settings.AMOUNT_OF_POSTS - 2)
+        ]
+        cls.old = [
+            Post.objects.create(text=f'Старый пост {i}', author=cls.user)
+            for i in range(5)
+        ]
+        for days, post in enumerate(cls.old, start=100):
+            Post.objects.filter(id=post.id).update(
+                pub_date=timezone.now() - timedelta(days=days)
+            )
+        cls.comment = Comment.objects.create(
+            text='Комментарий', post=cls.old[0], author=cls.user
+        )
+        call_command('archive_posts', days=30, stdout=StringIO())
+
+    def test_post_detail_falls_through_to_archive(self):
+        """Проверяем, что архивный пост открывается по прежнему адресу."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.old[0].id])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['post'].is_archived)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [self.comment.text]
+        )
+
+    def test_profile_continues_into_archive(self):
+        """Проверяем, что профиль листается дальше в архив."""
+        url = reverse('posts:profile', args=[self.user.username])
+        first = self.client.get(url)
+        second = self.client.get(url, {'page': 2})
+        self.assertEqual(first.context['page_obj'].paginator.count,
+                         len(self.fresh) + len(self.old))
+        texts = [
+            post.text for post in
+            list(first.context['page_obj']) + list(second.context['page_obj'])
+        ]
+        self.assertEqual(
+            texts,
+            [post.text for post in reversed(self.fresh)]
+            + [post.text for post in self.old]
+        )
+
+    def test_archived_post_can_not_be_commented(self):
+        """Проверяем, что архивный пост нельзя комментировать."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.old[0].id]),
+            {'text': 'Новый комментарий'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.user = User.objects.create(username='auth')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.user)
+            for number in range(3)
+        ]
+
+    def test_export_is_staff_only(self):
+        """Проверяем, что выгрузка доступна только персоналу."""
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:export_table', args=['posts', 'csv'])
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_streams_rows_after_id(self):
+        """Проверяем потоковую выгрузку JSONL, начиная с заданного id."""
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:export_table', args=['posts', 'jsonl']),
+            {'after': self.posts[0].id},
+        )
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.id for post in self.posts[1:]]
+        )
+
+    def test_junk_after_exports_from_start(self):
+        """Проверяем, что мусор в after даёт выгрузку с начала."""
+        self.client.force_login(self.staff)
+        for after in ('²', '9' * 30):
+            with self.subTest(after=after):
+                response = self.client.get(
+                    reverse('posts:export_table', args=['posts', 'jsonl']),
+                    {'after': after},
+                )
+                lines = b''.join(response.streaming_content).splitlines()
+                self.assertEqual(len(lines), len(self.posts))
+
+    def test_unknown_table_is_not_found(self):
+        """Проверяем, что выгружаются только известные таблицы."""
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:export_table', args=['auth_user', 'csv'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        """Код ответа на повторный запрос с ETag первого ответа."""
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Проверяем ответ 304 на неизменившиеся страницы."""
+        for url in (
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:profile', args=['auth']),
+            reverse('posts:group_posts', args=['group']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('Last-Modified', response)
+                self.assertEqual(self.revalidate(url), 304)
+
+    def test_changes_produce_new_etag(self):
+        """Проверяем, что правка, комментарий и новый пост меняют ETag."""
+        detail = reverse('posts:post_detail', args=[self.post.id])
+        group = reverse('posts:group_posts', args=['group'])
+        changes = (
+            (detail, lambda: Comment.objects.create(
+                text='Комментарий', post=self.post, author=self.reader
+            )),
+            (detail, lambda: Post.objects.filter(id=self.post.id).get()
+             .save()),
+            (group, lambda: Post.objects.create(
+                text='Новый пост', author=self.reader, group=self.group
+            )),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                change()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_author_rename_produces_new_etag(self):
+        """Проверяем, что смена имени автора меняет ETag его страниц."""
+        urls = (
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:profile', args=['auth']),
+        )
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        author = User.objects.get(id=self.user.id)
+        author.first_name = 'Новое'
+        author.save()
+        # Пост с автором лежит в кеше объектов до OBJECT_CACHE_SECONDS.
+        cache.clear()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новое')
+
+    def test_etag_depends_on_user_and_following(self):
+        """Проверяем, что ETag профиля зависит от читателя и подписки."""
+        url = reverse('posts:profile', args=['auth'])
+        anonymous = self.client.get(url)['ETag']
+        self.client.force_login(self.reader)
+        before = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        after = self.client.get(url)['ETag']
+        self.assertEqual(len({anonymous, before, after}), 3)
+
+    def test_validators_share_page_with_view(self):
+        """Проверяем, что страница постов и подписка читаются один раз."""
+        self.client.force_login(self.reader)
+        for url, table in (
+            (reverse('posts:profile', args=['auth']), '"posts_follow"'),
+            (reverse('posts:profile', args=['auth']), 'FROM "posts_post"'),
+            (reverse('posts:group_posts', args=['group']),
+             'FROM "posts_post"'),
+        ):
+            with self.subTest(url=url, table=table):
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertEqual(sum(
+                    table in query['sql'] and 'COUNT(' not in query['sql']
+                    for query in queries
+                ), 1)
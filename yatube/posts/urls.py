@@ -1,29 +1,47 @@
-from django.urls import path
+from django.urls import path, register_converter
 
-from . import views
+from . import converters, views
+
+register_converter(converters.IdConverter, 'id')
+register_converter(converters.UsernameConverter, 'username')
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.create_post, name='create_post'),
-    path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
-    path('profile/<username>/', views.profile, name='profile'),
-    path('posts/<post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<id:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('profile/<username:username>/', views.profile, name='profile'),
+    path('posts/<id:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<id:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path(
+        'posts/<id:post_id>/comments/<id:comment_id>/',
+        views.comment_thread,
+        name='comment_thread'
+    ),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path(
-        'posts/<int:post_id>/comment/',
+        'posts/<id:post_id>/comment/',
         views.add_comment,
         name='add_comment'
     ),
+    path(
+        'export/<slug:table>.<slug:fmt>',
+        views.export_table,
+        name='export_table'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
     path(
-        'profile/<str:username>/follow/',
+        'profile/<username:username>/follow/',
         views.profile_follow,
         name='profile_follow'
     ),
     path(
-        'profile/<str:username>/unfollow/',
+        'profile/<username:username>/unfollow/',
         views.profile_unfollow,
         name='profile_unfollow'
     ),
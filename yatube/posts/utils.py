@@ -1,8 +1,219 @@
-from django.core.paginator import Paginator
+from contextlib import contextmanager
+
 from django.conf import settings
+from django.db.models import Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core.counting import CachedCountPaginator, count, count_key
+from core.objects import cached_object, object_key
+from .converters import parse_id
+from .deletion import exclude_hidden, is_hidden, visible_count_key
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Post, check_path,
+)
 
 
-def pagin(request, post_list):
-    paginator = Paginator(post_list, settings.AMOUNT_OF_POSTS)
+def pagin(request, post_list, count_key=None):
+    paginator = CachedCountPaginator(
+        post_list, settings.AMOUNT_OF_POSTS, count_key=count_key
+    )
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def page_paths(post_ids=(), group_slugs=(), usernames=(), index=False):
+    """Пути гостевых страниц, на которых видны изменённые объекты."""
+    paths = [reverse('posts:index')] if index else []
+    paths += [reverse('posts:post_detail', args=[pk]) for pk in post_ids]
+    paths += [reverse('posts:group_posts', args=[slug])
+              for slug in group_slugs]
+    paths += [reverse('posts:profile', args=[name]) for name in usernames]
+    return paths
+
+
+# Архивные таблицы делят id с горячими (см. archive_posts).
+ARCHIVES = {Post: ArchivedPost, Comment: ArchivedComment}
+
+
+def next_free_id(model):
+    """Первый свободный id для вставки строк model с явными id."""
+    tables = [model, ARCHIVES[model]] if model in ARCHIVES else [model]
+    return max(
+        table.objects.aggregate(Max('id'))['id__max'] or 0
+        for table in tables
+    ) + 1
+
+
+def taken_ids(model, ids):
+    """Какие из ids уже заняты строками model или её архива."""
+    tables = [model, ARCHIVES[model]] if model in ARCHIVES else [model]
+    taken = set()
+    for table in tables:
+        taken.update(
+            table.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+    return taken
+
+
+def load_post(post_id):
+    """Пост из горячей таблицы, а если его там нет, то из архива."""
+    try:
+        return Post.objects.select_related('author', 'group').get(
+            id=post_id
+        )
+    except Post.DoesNotExist:
+        return get_object_or_404(
+            ArchivedPost.objects.select_related('author', 'group'),
+            id=post_id
+        )
+
+
+def get_post_or_404(post_id):
+    """
+    Пост с автором и группой из кеша объектов. Горячий и архивный
+    пост лежат под одним ключом: id у них общие.
+    """
+    post_id = parse_id(post_id)
+    if post_id is None:
+        raise Http404
+    post = cached_object(
+        object_key(Post, id=post_id), lambda: load_post(post_id)
+    )
+    if is_hidden('post', post.pk) or is_hidden('user', post.author_id):
+        raise Http404
+    return post
+
+
+class ChainedSequence:
+    """
+    Несколько отсортированных выборок подряд, для Paginator.
+    Страница читается только из тех выборок, на которые попадает,
+    так что архив не трогается, пока листают свежие посты.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self.counts = None
+
+    def count(self):
+        if self.counts is None:
+            self.counts = [count(queryset) for queryset in self.querysets]
+        return sum(self.counts)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        self.count()
+        start, stop = index.start or 0, index.stop
+        items = []
+        for queryset, size in zip(self.querysets, self.counts):
+            if stop is not None and stop <= 0:
+                break
+            if start < size:
+                end = size if stop is None else min(stop, size)
+                items.extend(queryset[start:end])
+            start = max(start - size, 0)
+            if stop is not None:
+                stop -= size
+        return items
+
+
+def shared(request, name, compute):
+    """
+    Значение, нужное и валидаторам условного GET (conditional.py),
+    и представлению: за запрос оно считается один раз.
+    """
+    values = request.__dict__.setdefault('_shared', {})
+    if name not in values:
+        values[name] = compute()
+    return values[name]
+
+
+def group_page(request, group):
+    return shared(request, 'page', lambda: pagin(
+        request,
+        exclude_hidden(group.posts.select_related('author', 'group')),
+        visible_count_key(count_key(Post, group_id=group.id)),
+    ))
+
+
+def profile_page(request, author):
+    # Архивные посты старше горячих, поэтому идут следом за ними.
+    return shared(request, 'page', lambda: pagin(request, ChainedSequence(
+        exclude_hidden(author.posts.select_related('author', 'group')),
+        exclude_hidden(
+            author.archived_posts.select_related('author', 'group')
+        ),
+    )))
+
+
+def is_following(request, author):
+    return shared(request, 'following', lambda: (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    ))
+
+
+def author_post_count(author_id):
+    """Число постов автора через кешируемый счётчик (core/counting.py)."""
+    return count(
+        Post.objects.filter(author_id=author_id),
+        count_key(Post, author_id=author_id),
+    )
+
+
+# Миниатюра из шаблонов includes/article.html и posts/post_detail.html.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def warm_thumbnail(post):
+    """
+    Готовит миниатюру картинки сразу после записи: первая отрисовка
+    ленты иначе создаёт её сама и по нескольку раз ходит в хранилище
+    ключей sorl-thumbnail.
+    """
+    if post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+def comments_page(comments, cursor=None):
+    """
+    Keyset-пагинация комментариев в порядке материализованного пути:
+    ветки идут целиком, ответы сразу под родителем.
+    Возвращает порцию комментариев и курсор следующей порции,
+    стоимость не зависит от общего числа комментариев.
+    """
+    limit = settings.AMOUNT_OF_COMMENTS
+    if cursor and cursor.isdigit():
+        comments = comments.filter(path__gt=cursor)
+    batch = list(comments.order_by('path')[:limit + 1])
+    if len(batch) <= limit:
+        return batch, None
+    batch = batch[:limit]
+    return batch, check_path(batch[-1].path)
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """
+    Отключает auto_now_add у моделей, чтобы bulk_create сохранил
+    заданные даты. Только для команд загрузки данных.
+    """
+    fields = [
+        field for model in models for field in model._meta.fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
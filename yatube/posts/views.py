@@ -1,17 +1,38 @@
 from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.urls import reverse
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie, vary_on_headers
 
-from .models import Post, Group, User, Follow
+from core import writes
+from core.counting import count_key
+from core.objects import get_cached_or_404
+from . import conditional, export
+from .converters import parse_id
+from .models import (
+    Post, Group, User, Follow, Comment, ArchivedComment
+)
+from .deletion import (
+    exclude_hidden, exclude_hidden_comments, is_hidden, visible_count_key,
+)
 from .forms import PostForm, CommentForm
-from .utils import pagin
+from .utils import (
+    author_post_count, comments_page, get_post_or_404, group_page,
+    is_following, pagin, profile_page, warm_thumbnail,
+)
 
 
 @cache_page(settings.KEEP_IN_CACHE, key_prefix='index_page')
+@vary_on_cookie
 def index(request):
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = pagin(request, post_list)
+    post_list = exclude_hidden(
+        Post.objects.select_related('author', 'group')
+    )
+    page_obj = pagin(request, post_list, visible_count_key(count_key(Post)))
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
@@ -19,49 +40,106 @@ def index(request):
     return render(request, template, context)
 
 
+@condition(conditional.group_posts_etag,
+           conditional.group_posts_last_modified)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author', 'group')
-    page_obj = pagin(request, post_list)
+    group = get_cached_or_404(Group, slug=slug)
+    if is_hidden('group', group.pk):
+        raise Http404
     template = 'posts/group_list.html'
     context = {
         'group': group,
-        'page_obj': page_obj,
+        'page_obj': group_page(request, group),
     }
     return render(request, template, context)
 
 
+@condition(conditional.profile_etag, conditional.profile_last_modified)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author', 'group')
-    page_obj = pagin(request, post_list)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
-    else:
-        following = False
+    author = get_cached_or_404(User, username=username)
+    if is_hidden('user', author.pk):
+        raise Http404
     context = {
-        'following': following,
+        'following': is_following(request, author),
         'author': author,
-        'page_obj': page_obj,
+        'page_obj': profile_page(request, author),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(conditional.post_detail_etag,
+           conditional.post_detail_last_modified)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.select_related('post', 'author')
+    post = get_post_or_404(post_id)
+    comments, next_cursor = comments_page(
+        exclude_hidden_comments(post.comments.select_related('author'))
+    )
     form = CommentForm()
     context = {
         'post': post,
+        'author_posts': author_post_count(post.author_id),
         'form': form,
         'comments': comments,
+        'next_cursor': next_cursor,
+        'more_url': reverse('posts:post_comments', args=[post.id]),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    post = get_post_or_404(post_id)
+    comments, next_cursor = comments_page(
+        exclude_hidden_comments(post.comments.select_related('author')),
+        request.GET.get('after')
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'more_url': reverse('posts:post_comments', args=[post.id]),
+    }
+    return render(request, 'posts/includes/comments_list.html', context)
+
+
+@vary_on_headers('X-Requested-With')
+def comment_thread(request, post_id, comment_id):
+    """
+    Ветка комментария. Подгрузке следующей порции (XHR) отдаётся
+    только список, переходу по ссылке — страница целиком.
+    """
+    model = Comment
+    root = Comment.objects.select_related('post').filter(
+        id=comment_id,
+        post_id=post_id
+    ).first()
+    if root is None:
+        model = ArchivedComment
+        root = get_object_or_404(
+            ArchivedComment.objects.select_related('post'),
+            id=comment_id,
+            post_id=post_id
+        )
+    if is_hidden('post', root.post_id) or is_hidden('user', root.author_id):
+        raise Http404
+    comments, next_cursor = comments_page(
+        exclude_hidden_comments(
+            model.objects.subtree(root).select_related('author')
+        ),
+        request.GET.get('after')
+    )
+    context = {
+        'post': root.post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'more_url': reverse(
+            'posts:comment_thread', args=[post_id, comment_id]
+        ),
+    }
+    if request.is_ajax():
+        return render(request, 'posts/includes/comments_list.html', context)
+    return render(request, 'posts/comment_thread.html', context)
+
+
 @login_required
 def create_post(request):
     form = PostForm(
@@ -74,15 +152,19 @@ def create_post(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        form.save()
+        warm_thumbnail(writes.submit(form.save))
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', context)
 
 
 @login_required
 def post_edit(request, post_id):
+    # Не из кеша: форма сохраняет объект целиком, и устаревшая копия
+    # затёрла бы чужие изменения. Архивные посты не правятся.
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if is_hidden('post', post.pk) or is_hidden('user', post.author_id):
+        raise Http404
+    if request.user.id != post.author_id:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -95,33 +177,51 @@ def post_edit(request, post_id):
         'is_edit': True,
     }
     if form.is_valid():
-        form.save()
+        warm_thumbnail(writes.submit(form.save))
         return redirect('posts:post_detail', post_id=post_id)
     return render(request, 'posts/create_post.html', context)
 
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_post_or_404(post_id)
+    if post.is_archived:
+        raise Http404
+    parent_id = parse_id(
+        request.POST.get('parent') or request.GET.get('parent')
+    )
+    parent = None
+    if parent_id is not None:
+        parent = post.comments.filter(id=parent_id).first()
     form = CommentForm(request.POST or None)
-    context = {
-        'post': post,
-        'form': form,
-        'comments': comments,
-    }
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        form.save()
+        comment.parent = parent
+        writes.submit(form.save)
         return redirect('posts:post_detail', post_id=post_id)
+    # Комментарии нужны, только если форму показываем снова.
+    comments, next_cursor = comments_page(
+        exclude_hidden_comments(post.comments.select_related('author'))
+    )
+    context = {
+        'post': post,
+        'author_posts': author_post_count(post.author_id),
+        'form': form,
+        'parent': parent,
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'more_url': reverse('posts:post_comments', args=[post.id]),
+    }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
 def follow_index(request):
-    posts_of_follow = Post.objects.filter(author__following__user=request.user)
+    posts_of_follow = exclude_hidden(Post.objects.filter(
+        author__following__user=request.user
+    ).select_related('author', 'group'))
     page_obj = pagin(request, posts_of_follow)
     context = {
         'page_obj': page_obj,
@@ -131,9 +231,10 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_cached_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(
+        writes.submit(
+            Follow.objects.get_or_create,
             user=request.user,
             author=author
         )
@@ -142,9 +243,38 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    Follow.objects.filter(
+    author = get_cached_or_404(User, username=username)
+    writes.submit(Follow.objects.filter(
         user=request.user,
         author=author
-    ).delete()
+    ).delete)
     return redirect('posts:profile', username=username)
+
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+@staff_member_required
+def export_table(request, table, fmt):
+    """
+    Выгрузка таблицы потоком. ?after=<id> продолжает прерванную
+    выгрузку, ?gzip=1 сжимает её.
+    """
+    if table not in export.TABLES or fmt not in export.FORMATS:
+        raise Http404
+    after = parse_id(request.GET.get('after')) or 0
+    compress = request.GET.get('gzip') == '1'
+    filename = f'{table}.{fmt}'
+    content_type = CONTENT_TYPES[fmt]
+    if compress:
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        export.export(table, fmt, after, compress),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -32,12 +34,21 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.timing.ServerTimingMiddleware',
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.anonymous.AnonymousCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.memory.MemoryTrackingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.queries.QueryBudgetMiddleware',
+    'core.middleware.queries.SlowQueryMiddleware',
+    'core.middleware.writes.WriteQueueMiddleware',
+    'core.middleware.replicas.ReplicaMiddleware',
 ]
 
 
@@ -47,7 +58,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,11 +79,50 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Прагмы, повторы при блокировке и режим транзакций
+        # описаны в core/db/backends/sqlite3/base.py.
+        'OPTIONS': {
+            'profile': 'production',
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Реплики только для чтения, копии основной базы. Для локальной
+# проверки подойдут файлы SQLite, обновляемые командой refresh_replicas:
+# DATABASES['replica'] = {
+#     'ENGINE': 'core.db.backends.sqlite3',
+#     'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#     'OPTIONS': {'pragmas': {'query_only': 1}},
+#     'TEST': {'MIRROR': 'default'},
+# }
+DATABASE_REPLICAS = []
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Чьи модели можно читать с реплик и в каких представлениях.
+REPLICA_APPS = ('posts',)
+
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:follow_index',
+)
+
+# Представления, которые пишут в базу на GET-запрос.
+REPLICA_PIN_VIEWS = (
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+)
+
+# Сколько после своей записи пользователь читает из основной базы.
+REPLICA_PIN_SECONDS = 60
+
+REPLICA_PIN_COOKIE_NAME = 'primary_pin'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,10 +165,127 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 AMOUNT_OF_POSTS = 10
 
+AMOUNT_OF_COMMENTS = 20
+
 SYMBOLS_IN_STR = 15
 
 KEEP_IN_CACHE = 20
 
+# Бюджеты SQL-запросов и времени ответа по именам представлений.
+# Один запрос из них — список скрытых объектов при холодном кеше.
+QUERY_BUDGETS = {
+    'posts:index': {'queries': 5, 'ms': 300},
+    'posts:group_posts': {'queries': 6, 'ms': 300},
+    'posts:profile': {'queries': 7, 'ms': 300},
+    'posts:post_detail': {'queries': 7, 'ms': 300},
+    'posts:follow_index': {'queries': 5, 'ms': 300},
+}
+
+QUERY_BUDGET_STRICT = DEBUG
+
+N_PLUS_ONE_THRESHOLD = 5
+
+SLOW_QUERY_MS = 100
+
+# Одна форма медленного запроса пишется в лог не чаще раза в интервал.
+SLOW_QUERY_LOG_INTERVAL = 60
+
+# Запросы медленнее порога пишутся в лог с разбивкой по фазам.
+SERVER_TIMING_LOG_MS = 500
+
+# Файлы метрик воркеров, очищается при выкладке.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube_metrics')
+
+METRICS_FLUSH_SECONDS = 10
+
+# Кроме персонала /metrics отдаётся только сборщику метрик с этих
+# адресов (REMOTE_ADDR). Адрес обратного прокси сюда не добавлять:
+# через него придут все.
+METRICS_ALLOWED_IPS = []
+
+# Выборки меньше порога считаются точно, большие — через кеш
+# (core/counting.py).
+COUNT_EXACT_THRESHOLD = 10000
+
+COUNT_CACHE_SECONDS = 300
+
+# Посты старше стольких дней archive_posts переносит в архив.
+ARCHIVE_AFTER_DAYS = 365
+
+# Удаление пользователей, постов и групп пачками (posts/deletion.py).
+DELETION_CHUNK_SIZE = 100
+
+# Пауза между пачками, чтобы другие писатели успевали взять блокировку.
+DELETION_PAUSE = 0.01
+
+DELETION_HIDDEN_CACHE_SECONDS = 10
+
+# Время жизни кеша постов, групп и пользователей (core/objects.py).
+# Кеш у каждого процесса свой, сигналы сбрасывают его только в том
+# процессе, где прошла запись: другие воркеры отдают старую версию
+# объекта не дольше этого времени.
+OBJECT_CACHE_SECONDS = 10
+
+NEGATIVE_CACHE_SECONDS = 60
+
+# Входит в ETag страниц (posts/conditional.py): увеличить при выкладке
+# изменённых шаблонов, чтобы клиенты не получили 304 на старую вёрстку.
+PAGE_ETAG_VERSION = 1
+
+# Сессии в подписанных cookie, без таблицы django_session.
+SESSION_ENGINE = 'core.sessions'
+
+# Страницы, которые гости без сессии получают без cookie и с
+# Cache-Control: public (core/middleware/anonymous.py).
+ANONYMOUS_CACHE_VIEWS = (
+    'posts:index',
+    'posts:group_posts',
+    'posts:profile',
+    'posts:post_detail',
+)
+
+# Сколько общий кеш хранит гостевую страницу.
+ANONYMOUS_CACHE_SECONDS = 60
+
+# Адреса прокси, которым после записи отправляется PURGE (core/purge.py).
+CACHE_PURGE_URLS = []
+
+CACHE_PURGE_TIMEOUT = 2
+
+# Строк в одном запросе потоковой выгрузки (posts/export.py).
+EXPORT_CHUNK_SIZE = 2000
+
+# Строк в одной пачке массовых действий модерации в админке.
+MODERATION_CHUNK_SIZE = 1000
+
+# Записи в представлениях идут через один поток-писатель (core/writes.py).
+WRITE_QUEUE_ENABLED = True
+
+# Наибольшее число записей в одной транзакции очереди.
+WRITE_QUEUE_BATCH = 64
+
+# Сколько секунд запрос ждёт свою запись, потом отвечает 503.
+WRITE_QUEUE_TIMEOUT = 10
+
+PROFILER_ENABLED = False
+
+PROFILER_SAMPLE_RATE = 0.001
+
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+PROFILER_MAX_BYTES = 100 * 1024 * 1024
+
+MEMORY_TRACKING_ENABLED = False
+
+MEMORY_TRACKING_SAMPLE_RATE = 0.01
+
+MEMORY_TRACKING_FRAMES = 1
+
+# Каталог, куда каждый процесс после замера пишет свой <pid>.json;
+# отчёт складывает файлы всех процессов. Без него отчёт только
+# по процессу, который отвечает на запрос.
+MEMORY_TRACKING_DIR = None
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
@@ -127,6 +294,35 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.backends.TimedLocMemCache',
+    },
+    # Промахи поиска объектов (core/objects.py), отдельно от основного
+    # кеша, чтобы перебор адресов не вытеснял из него нужные объекты.
+    'negative': {
+        'BACKEND': 'core.backends.TimedLocMemCache',
+        'LOCATION': 'negative',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+THUMBNAIL_BACKEND = 'core.backends.TimedThumbnailBackend'
+
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            # Под тестами бюджеты, N+1 и медленные запросы не печатаются;
+            # проверки этих сообщений используют assertLogs.
+            'level': 'ERROR' if TESTING else 'INFO',
+        },
+    },
 }
@@ -3,8 +3,13 @@ from django.conf.urls.static import static
 from django.urls import include, path
 from django.contrib import admin
 
+from core.views import csrf_token, memory_report, metrics_view
+
 urlpatterns = [
+    path('admin/memory/', memory_report, name='memory_report'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('csrf/', csrf_token, name='csrf_token'),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),